@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-# pylint: disable=invalid-name
+# pylint: disable=invalid-name,import-outside-toplevel,too-many-lines
 """
 Convert a log to another format.
 
@@ -11,14 +11,13 @@ Author(s):
 License: MIT License
 """
 
-import argparse
-import datetime as dt
-import json
+# Modules that are not always needed are imported where they are used
+# to keep the startup time short.
+import contextlib
+import itertools
 import os
 import re
 import sys
-import xml.etree.ElementTree as ET  # nosec
-from typing import List
 
 
 def remove_prefix(string, prefix):
@@ -36,6 +35,8 @@ def convert_notices_to_checkstyle(notices, root_path=None):
     """
     Convert annotation list to CheckStyle xml string
     """
+    import xml.etree.ElementTree as ET  # nosec
+
     root = ET.Element("checkstyle", version="6.5")
     for fields in notices:
         add_error_entry(root, **fields, root_path=root_path)
@@ -46,12 +47,22 @@ def convert_lines_to_notices(lines):
     """
     Convert provided message to CheckStyle format.
     """
-    notices = []
+    return list(iter_lines_to_notices(lines))
+
+
+def iter_lines_to_notices(lines, state=None):
+    """
+    Convert provided lines to notices, yielding each notice.
+
+    :param state: Optional dict holding the group state (see
+                  iter_parse_file).
+    """
+    if state is None:
+        state = {}
     for line in lines:
-        fields = parse_message(line)
+        fields = parse_message(line.rstrip("\r\n"), state)
         if fields:
-            notices.append(fields)
-    return notices
+            yield fields
 
 
 def convert_text_to_notices(text):
@@ -67,51 +78,46 @@ def gh_escape_data(value):
     """
     if value is None:
         return None
-    res = ""
-    for char in value:
-        res += {"\r": "%0D", "\n": "%0A", "%": "%25"}.get(char, char)
-
-    return res
+    return value.replace("%", "%25").replace("\r", "%0D").replace("\n", "%0A")
 
 
 def gh_escape_property(value):
     """
     Escape data for property in github action message
     """
-    res = ""
-    for char in value:
-        res += {
-            "\r": "%0D",
-            "\n": "%0A",
-            ":": "%3A",
-            ",": "%2C",
-            "%": "%25",
-        }.get(char, char)
+    return gh_escape_data(value).replace(":", "%3A").replace(",", "%2C")
 
-    return res
 
-
-def print_filenames(notices):
+def print_filenames(notices, stream=None):
     """
     Print filenames found in notices, ordered and unique
     """
 
-    print("\n".join(sorted({notice["file_name"] for notice in notices})))
+    print(
+        "\n".join(sorted({notice["file_name"] for notice in notices})),
+        file=stream,
+    )
 
 
-def gh_fix_path(path) -> str:
+def gh_fix_path(path, environ=None) -> str:
     """
     Fix the path with may be absolute in a github context.
 
     Remove the project prefix, convert to unix-like relative path.
+
+    :param environ: Environment mapping (default: os.environ)
     """
-    if not hasattr(gh_fix_path, "prefix_regex"):
+    if environ is None:
+        environ = os.environ
+    GITHUB_WORKSPACE = environ.get("GITHUB_WORKSPACE", None)
+    # The prefix regex is computed again when the workspace changes
+    if getattr(gh_fix_path, "workspace", False) != GITHUB_WORKSPACE:
+        gh_fix_path.workspace = GITHUB_WORKSPACE  # type: ignore[attr-defined]
         # Default
         gh_fix_path.prefix_regex = (  # type: ignore[attr-defined]
             re.compile(r"^(.*)")
         )
 
-        GITHUB_WORKSPACE = os.environ.get("GITHUB_WORKSPACE", None)
         if GITHUB_WORKSPACE is not None:
             result = re.search(r"([^/\\]+)[/\\]([^/\\]+)$", GITHUB_WORKSPACE)
 
@@ -135,27 +141,173 @@ def gh_fix_path(path) -> str:
     return unixlike_path
 
 
-def gh_print_notices(notices):
+# Default maximum number of github annotations (GitHub only shows a few
+# of them, the others only fill the log)
+GH_MAX_ANNOTATIONS = 1000
+# Number of github annotations written at once
+GH_ANNOTATION_BATCH_SIZE = 100
+# Number of files listed in the github step summary
+GH_SUMMARY_TOP_FILES = 10
+
+
+def gh_format_notice(notice, environ=None) -> str:
+    """
+    Format a notice as a github workflow command (annotation)
+    """
+    info: list[str] = []
+
+    if notice.get("file_name", None) is not None:
+        file_name = gh_fix_path(notice["file_name"], environ=environ)
+        info.append("file=" + gh_escape_property(file_name))
+    if notice.get("line", None) is not None:
+        info.append(f"line={notice['line']}")
+    if notice.get("column", None) is not None:
+        info.append(f"col={notice['column']}")
+
+    return (
+        f"::{notice['severity']} "
+        f"{','.join(info)}::{gh_escape_data(notice['message'])}\n"
+    )
+
+
+def gh_print_notices(notices, stream=None, environ=None, max_annotations=None):
     """
     Print notices for github actions
+
+    :param stream: Stream to print to (default: stdout)
+    :param environ: Environment mapping (default: os.environ)
+    :param max_annotations: Maximum number of annotations (no limit when
+                            None), see iter_annotated_notices.
     """
+    for _notice in iter_annotated_notices(
+        notices, stream, environ, max_annotations
+    ):
+        pass
 
-    for notice in notices:
-        info: List[str] = []
 
-        if notice.get("file_name", None) is not None:
-            info.append(
-                "file=" + gh_escape_property(gh_fix_path(notice["file_name"]))
-            )
-        if notice.get("line", None) is not None:
-            info.append(f"line={notice['line']}")
-        if notice.get("column", None) is not None:
-            info.append(f"col={notice['column']}")
-
-        print(
-            f"::{notice['severity']} "
-            f"{','.join(info)}::{gh_escape_data(notice['message'])}"
+def iter_annotated_notices(
+    notices, stream=None, environ=None, max_annotations=None
+):
+    """
+    Print the github annotation of each notice when it is passed on.
+
+    Annotations are written by batches of GH_ANNOTATION_BATCH_SIZE.  The
+    notices beyond max_annotations are only counted and reported in a
+    final annotation.
+    """
+    if stream is None:
+        stream = sys.stdout
+    batch: list[str] = []
+    skipped = 0
+    for count, notice in enumerate(notices):
+        if max_annotations is not None and count >= max_annotations:
+            skipped += 1
+        else:
+            batch.append(gh_format_notice(notice, environ=environ))
+            if len(batch) >= GH_ANNOTATION_BATCH_SIZE:
+                stream.write("".join(batch))
+                batch.clear()
+        yield notice
+    if skipped:
+        batch.append(
+            f"::notice::{skipped} more notices were not annotated"
+            f" (limit: {max_annotations})\n"
         )
+    stream.write("".join(batch))
+
+
+def new_notice_summary() -> dict:
+    """
+    Get an empty summary of notices (see iter_summarized_notices)
+    """
+    return {"total": 0, "severities": {}, "files": {}, "patterns": {}}
+
+
+def iter_summarized_notices(notices, summary):
+    """
+    Count the notices per severity, file and pattern while passing them on.
+
+    :param summary: Summary dict (from new_notice_summary) that is updated.
+    """
+    severities = summary["severities"]
+    files = summary["files"]
+    patterns = summary["patterns"]
+    for notice in notices:
+        severity = notice["severity"]
+        severities[severity] = severities.get(severity, 0) + 1
+        file_severities = files.setdefault(notice["file_name"], {})
+        file_severities[severity] = file_severities.get(severity, 0) + 1
+        pattern = notice.get("pattern", None)
+        patterns[pattern] = patterns.get(pattern, 0) + 1
+        summary["total"] += 1
+        yield notice
+
+
+def format_notice_summary(summary, top_files=GH_SUMMARY_TOP_FILES) -> str:
+    """
+    Format a summary of notices as Markdown (for a github step summary)
+    """
+    import heapq
+
+    def escape(value):
+        return str(value).replace("|", "\\|")
+
+    severities = sorted(
+        summary["severities"],
+        key=lambda severity: (
+            SEVERITY_ORDER.get(severity, len(SEVERITY_ORDER)),
+            severity,
+        ),
+    )
+    lines = [f"### {summary['total']} notices", ""]
+    if not summary["total"]:
+        return "\n".join(lines)
+
+    lines += ["| Severity | Notices |", "| --- | ---: |"]
+    for severity in severities:
+        lines.append(f"| {severity} | {summary['severities'][severity]} |")
+
+    files = summary["files"]
+    lines += [
+        "",
+        f"#### Top {min(top_files, len(files))} of {len(files)} files",
+        "",
+        "| File | Notices | " + " | ".join(severities) + " |",
+        "| --- | ---: |" + " ---: |" * len(severities),
+    ]
+    for file_name, file_severities in heapq.nlargest(
+        top_files,
+        files.items(),
+        key=lambda item: sum(item[1].values()),
+    ):
+        counts = [file_severities.get(severity, 0) for severity in severities]
+        cells = [escape(file_name), str(sum(counts)), *map(str, counts)]
+        lines.append("| " + " | ".join(cells) + " |")
+
+    lines += ["", "| Pattern | Notices |", "| --- | ---: |"]
+    for pattern, count in sorted(
+        summary["patterns"].items(),
+        key=lambda item: (-item[1], str(item[0])),
+    ):
+        lines.append(f"| {escape(pattern or '-')} | {count} |")
+    lines.append("")
+    return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def gh_step_summary(file_name):
+    """
+    Provide a summary of notices, appended to file_name when done.
+
+    Provides None when file_name is not set.
+    """
+    if not file_name:
+        yield None
+        return
+    summary = new_notice_summary()
+    yield summary
+    with open(file_name, "a", encoding="utf_8") as summary_file:
+        summary_file.write(format_notice_summary(summary) + "\n")
 
 
 def gl_notices(notices):
@@ -196,6 +348,126 @@ def gl_notices(notices):
     return result
 
 
+# Number of notices written in one go (and flushed) for NDJSON output
+NDJSON_BATCH_SIZE = 100
+
+# Fields that are always present in a notice (possibly None)
+NOTICE_FIELDS = ("file_name", "line", "column", "severity", "message")
+
+
+def notice_to_ndjson(notice) -> str:
+    """
+    Convert notice to a compact JSON line (fields set to None are omitted)
+    """
+    import json
+
+    fields = {key: value for key, value in notice.items() if value is not None}
+    return json.dumps(fields, separators=(",", ":")) + "\n"
+
+
+def write_ndjson_notices(notices, *streams, batch_size=NDJSON_BATCH_SIZE):
+    """
+    Write notices as NDJSON to the streams while they are produced.
+
+    Lines are written and flushed every `batch_size` notices.
+    Returns the number of notices written.
+    """
+    count = 0
+    batch: list[str] = []
+    for notice in notices:
+        batch.append(notice_to_ndjson(notice))
+        if len(batch) >= batch_size:
+            count += flush_ndjson_batch(batch, streams)
+    count += flush_ndjson_batch(batch, streams)
+    return count
+
+
+def flush_ndjson_batch(batch, streams):
+    """
+    Write NDJSON lines in batch to the streams and clear the batch.
+    """
+    count = len(batch)
+    if count:
+        data = "".join(batch)
+        for stream in streams:
+            stream.write(data)
+            stream.flush()
+        batch.clear()
+    return count
+
+
+def notice_key(notice) -> int:
+    """
+    Get the 64-bit hash identifying a notice for de-duplication.
+
+    It combines the file name, line, column, severity and message.
+    """
+    return hash(tuple(notice.get(field, None) for field in NOTICE_FIELDS))
+
+
+def dedup_notices(notices, count=False):
+    """
+    Drop notices that are identical to an earlier notice.
+
+    Only a 64-bit hash of each unique notice is remembered which costs
+    about 80 bytes per unique notice (depending on the fill rate of the
+    set) whatever the length of the message.
+    Unique notices are yielded as they come.
+
+    :param count: When True, set the number of occurrences in the 'count'
+                  field (counts already present are added up).  The
+                  unique notices are then kept in memory and yielded once
+                  all notices are consumed.
+    """
+    if count:
+        return _iter_counted_notices(notices)
+    return _iter_unique_notices(notices)
+
+
+def _iter_unique_notices(notices):
+    """
+    Generator for dedup_notices without counts.
+    """
+    seen = set()
+    for notice in notices:
+        key = notice_key(notice)
+        if key not in seen:
+            seen.add(key)
+            yield notice
+
+
+def _iter_counted_notices(notices):
+    """
+    Generator for dedup_notices with counts.
+    """
+    counted: dict[int, dict] = {}
+    for notice in notices:
+        key = notice_key(notice)
+        occurrences = notice.get("count", None) or 1
+        first = counted.get(key, None)
+        if first is None:
+            notice["count"] = occurrences
+            counted[key] = notice
+        else:
+            first["count"] += occurrences
+    yield from counted.values()
+
+
+def read_ndjson_notices(lines):
+    """
+    Read notices from NDJSON lines as written by write_ndjson_notices.
+    """
+    import json
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        notice = dict.fromkeys(NOTICE_FIELDS)
+        notice.update(json.loads(line))
+        yield notice
+
+
 # Initial version for Checkrun from:
 # https://github.com/tayfun/flake8-your-pr/blob/50a175cde4dd26a656734c5b64ba1e5bb27151cb/src/main.py#L7C1-L123C36
 # MIT Licence
@@ -204,20 +476,23 @@ class CheckRun:
     Represents the check run
     """
 
-    GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN", None)
-    GITHUB_EVENT_PATH = os.environ.get("GITHUB_EVENT_PATH", None)
-
     URI = "https://api.github.com"
     API_VERSION = "2022-11-28"
     ACCEPT_HEADER_VALUE = "application/vnd.github+json"
-    AUTH_HEADER_VALUE = f"Bearer {GITHUB_TOKEN}"
     # This is the max annotations Github API accepts in one go.
     MAX_ANNOTATIONS = 50
 
-    def __init__(self):
+    def __init__(self, environ=None):
         """
         Initialise Check Run object with information from checkrun
+
+        :param environ: Environment mapping (default: os.environ)
         """
+        if environ is None:
+            environ = os.environ
+        self.GITHUB_TOKEN = environ.get("GITHUB_TOKEN", None)
+        self.GITHUB_EVENT_PATH = environ.get("GITHUB_EVENT_PATH", None)
+        self.AUTH_HEADER_VALUE = f"Bearer {self.GITHUB_TOKEN}"
         self.read_event_file()
         self.read_meta_data()
 
@@ -225,6 +500,8 @@ class CheckRun:
         """
         Read the event file to get the event information later.
         """
+        import json
+
         if self.GITHUB_EVENT_PATH is None:
             raise ValueError("Not running in github workflow")
         with open(self.GITHUB_EVENT_PATH, encoding="utf_8") as event_file:
@@ -264,7 +541,8 @@ class CheckRun:
 
         :param conclusion: success, failure
         """
-        # pylint: disable=import-outside-toplevel
+        import datetime as dt
+
         import requests  # Import here to not impose presence of module
 
         if self.head_sha is None:
@@ -339,109 +617,149 @@ PHPUNIT_DATASET_REGEX = (
 
 # List of message patterns, add more specific patterns earlier in the list
 # Creating patterns by using constants makes them easier to define and read.
+# The patterns are only compiled when needed (see get_compiled_patterns).
+# Entries are (name, pattern): the name is the 'pattern' of the notices.
 PATTERNS = [
     # sqlfluff (TODO: combine multiline messages)
-    re.compile(
-        rf"^== \[{FILEGROUP_REGEX}\]\s+{SEVERITYGROUP_REGEX}$"
-    ),  # Start file group
-    re.compile(rf"^L:{LINE_REGEX}\|\s+P:{COLUMN_REGEX}\|{MSG_REGEX}$"),
-    re.compile(r"^(?P<file_endgroup>(?P<severity_endgroup>All Finished!))"),
+    # Start file group
+    ("sqlfluff-group", rf"^== \[{FILEGROUP_REGEX}\]\s+{SEVERITYGROUP_REGEX}$"),
+    ("sqlfluff", rf"^L:{LINE_REGEX}\|\s+P:{COLUMN_REGEX}\|{MSG_REGEX}$"),
+    (
+        "sqlfluff-end",
+        r"^(?P<file_endgroup>(?P<severity_endgroup>All Finished!))",
+    ),
     # phpunit
-    re.compile(
-        r"(?P<severity_endgroup>Tests: \d+, Assertions: \d+"
-        r"(?:, Errors: \d+)?(?:, Failures: \d+)(?:, Skipped: \d+))\.$"
+    (
+        "phpunit-summary",
+        (
+            r"(?P<severity_endgroup>Tests: \d+, Assertions: \d+"
+            r"(?:, Errors: \d+)?(?:, Failures: \d+)(?:, Skipped: \d+))\.$"
+        ),
     ),
-    re.compile(rf"^There were \d+ {SEVERITYGROUP_REGEX}s?:$"),
-    re.compile(
-        rf"^\d+\){CLASS_METHOD_REGEX}{PHPUNIT_DATASET_REGEX}?\n"
-        rf"{MULTILINE_MSG_REGEX}${FILE_REGEX}:{LINE_REGEX}$"
+    ("phpunit-group", rf"^There were \d+ {SEVERITYGROUP_REGEX}s?:$"),
+    (
+        "phpunit",
+        (
+            rf"^\d+\){CLASS_METHOD_REGEX}{PHPUNIT_DATASET_REGEX}?\n"
+            rf"{MULTILINE_MSG_REGEX}${FILE_REGEX}:{LINE_REGEX}$"
+        ),
     ),
     # beautysh
     #  File ftp.sh: error: "esac" before "case" in line 90.
-    re.compile(
-        f"^File {FILE_REGEX}:{SEVERITY_REGEX}:"
-        f" {MSG_REGEX} in line {LINE_REGEX}.$"
+    (
+        "beautysh-line",
+        (
+            f"^File {FILE_REGEX}:{SEVERITY_REGEX}:"
+            f" {MSG_REGEX} in line {LINE_REGEX}.$"
+        ),
     ),
     # beautysh
     #  File socks4echo.sh: error: indent/outdent mismatch: -2.
-    re.compile(f"^File {FILE_REGEX}:{SEVERITY_REGEX}: {MSG_REGEX}$"),
+    ("beautysh", f"^File {FILE_REGEX}:{SEVERITY_REGEX}: {MSG_REGEX}$"),
     # yamllint
     # ##[group].pre-commit-config.yaml
     # ##[error]97:14 [trailing-spaces] trailing spaces
     # ##[endgroup]
-    re.compile(rf"^##\[group\]{FILEGROUP_REGEX}$"),  # Start file group
-    re.compile(
-        rf"^##\[{SEVERITY_REGEX}\]{LINE_REGEX}:{COLUMN_REGEX}{MSG_REGEX}$"
-    ),  # Msg
-    re.compile(r"^##(?P<file_endgroup>\[endgroup\])$"),  # End file group
+    # Start file group
+    ("yamllint-group", rf"^##\[group\]{FILEGROUP_REGEX}$"),
+    # Msg
+    (
+        "yamllint",
+        rf"^##\[{SEVERITY_REGEX}\]{LINE_REGEX}:{COLUMN_REGEX}{MSG_REGEX}$",
+    ),
+    # End file group
+    ("yamllint-endgroup", r"^##(?P<file_endgroup>\[endgroup\])$"),
     #  File socks4echo.sh: error: indent/outdent mismatch: -2.
-    re.compile(f"^File {FILE_REGEX}:{SEVERITY_REGEX}: {MSG_REGEX}$"),
+    (
+        "beautysh-duplicate",
+        f"^File {FILE_REGEX}:{SEVERITY_REGEX}: {MSG_REGEX}$",
+    ),
     # Emacs style
     #  path/to/file:845:5: error - Expected 1 space after closing brace
-    re.compile(
-        rf"^{FILE_REGEX}:{LINE_REGEX}:{COLUMN_REGEX}:{SEVERITY_REGEX}"
-        rf"(-\s+){MSG_REGEX}$"
+    (
+        "emacs",
+        (
+            rf"^{FILE_REGEX}:{LINE_REGEX}:{COLUMN_REGEX}:{SEVERITY_REGEX}"
+            rf"(-\s+){MSG_REGEX}$"
+        ),
     ),
     # ESLint (JavaScript Linter), RoboCop, shellcheck
     #  path/to/file.js:10:2: Some linting issue
     #  path/to/file.rb:10:5: Style/Indentation: Incorrect indentation detected
     #  path/to/script.sh:10:1: SC2034: Some shell script issue
-    re.compile(f"^{FILE_REGEX}:{LINE_REGEX}:{COLUMN_REGEX}: {MSG_REGEX}$"),
+    (
+        "file-line-column",
+        f"^{FILE_REGEX}:{LINE_REGEX}:{COLUMN_REGEX}: {MSG_REGEX}$",
+    ),
     # Cpplint default output:
     #           '%s:%s:  %s  [%s] [%d]\n'
     #   % (filename, linenum, message, category, confidence)
-    re.compile(f"^{FILE_REGEX}:{LINE_REGEX}:{MSG_REGEX}{CONFIDENCE_REGEX}$"),
+    ("cpplint", f"^{FILE_REGEX}:{LINE_REGEX}:{MSG_REGEX}{CONFIDENCE_REGEX}$"),
     # MSVC
     # file.cpp(10): error C1234: Some error message
-    re.compile(
-        f"^{FILE_REGEX}\\({LINE_REGEX}\\):{SEVERITY_REGEX}{MSG_REGEX}$"
-    ),
+    ("msvc", f"^{FILE_REGEX}\\({LINE_REGEX}\\):{SEVERITY_REGEX}{MSG_REGEX}$"),
     # Java compiler
     # File.java:10: error: Some error message
-    re.compile(f"^{FILE_REGEX}:{LINE_REGEX}:{SEVERITY_REGEX}:{MSG_REGEX}$"),
+    ("javac", f"^{FILE_REGEX}:{LINE_REGEX}:{SEVERITY_REGEX}:{MSG_REGEX}$"),
     # Python
     # File ".../logToCs.py", line 90 (note: code line follows)
-    re.compile(f'^File "{FILE_REGEX}", line {LINE_REGEX}$'),
+    ("python", f'^File "{FILE_REGEX}", line {LINE_REGEX}$'),
     # Pylint, others
     # path/to/file.py:10: [C0111] Missing docstring
     # others
-    re.compile(f"^{FILE_REGEX}:{LINE_REGEX}: {MSG_REGEX}$"),
+    ("file-line", f"^{FILE_REGEX}:{LINE_REGEX}: {MSG_REGEX}$"),
     # Shellcheck:
     # In script.sh line 76:
-    re.compile(
-        f"^In {FILE_REGEX} line {LINE_REGEX}:{EOL_REGEX}?"
-        f"({MULTILINE_MSG_REGEX})?{EOL_REGEX}{EOL_REGEX}"
+    (
+        "shellcheck",
+        (
+            f"^In {FILE_REGEX} line {LINE_REGEX}:{EOL_REGEX}?"
+            f"({MULTILINE_MSG_REGEX})?{EOL_REGEX}{EOL_REGEX}"
+        ),
     ),
     # eslint:
     #  /path/to/filename
     #    14:5  error  Unexpected trailing comma  comma-dangle
-    re.compile(
-        f"^{FILE_REGEX}{EOL_REGEX}"
-        rf"\s+{LINE_REGEX}:{COLUMN_REGEX}\s+{SEVERITY_REGEX}\s+{MSG_REGEX}$"
+    (
+        "eslint",
+        (
+            f"^{FILE_REGEX}{EOL_REGEX}"
+            rf"\s+{LINE_REGEX}:{COLUMN_REGEX}\s+{SEVERITY_REGEX}"
+            rf"\s+{MSG_REGEX}$"
+        ),
     ),
     # php lint: php -l
     # PHP Parse error:  syntax error, ... in path/to/file on line 531
-    re.compile(
-        rf"^PHP Parse error:\s+{MSG_REGEX} in {FILE_REGEX}"
-        f" on line {LINE_REGEX}$"
+    (
+        "php-lint",
+        (
+            rf"^PHP Parse error:\s+{MSG_REGEX} in {FILE_REGEX}"
+            f" on line {LINE_REGEX}$"
+        ),
     ),
     # hurl:
     #  error: Error message
     #     --> api/contracts/10_contracts.hurl:3:6
-    re.compile(
-        f"^error: {MSG_REGEX}{EOL_REGEX}"
-        rf"\s+--> {FILE_REGEX}:{LINE_REGEX}:{COLUMN_REGEX}$"
+    (
+        "hurl",
+        (
+            f"^error: {MSG_REGEX}{EOL_REGEX}"
+            rf"\s+--> {FILE_REGEX}:{LINE_REGEX}:{COLUMN_REGEX}$"
+        ),
     ),
     # Phan:
     # path\to\file.php:379 PhanKey Message...
-    re.compile(f"^{FILE_REGEX}:{LINE_REGEX} {MSG_REGEX}$"),
+    ("phan", f"^{FILE_REGEX}:{LINE_REGEX} {MSG_REGEX}$"),
     # PHP Fatal error (in phpunit) (single line):
     #   PHP Fatal error:  Message in path/to/file on line 91
     # Or:
     #   Fatal error:  Message in path/to/file on line 91
-    re.compile(
-        rf"^(?:PHP )(Fatal )?{SEVERITY_REGEX}:{MSG_REGEX}"
-        rf" in {FILE_REGEX} on line {LINE_REGEX}$"
+    (
+        "php-fatal",
+        (
+            rf"^(?:PHP )(Fatal )?{SEVERITY_REGEX}:{MSG_REGEX}"
+            rf" in {FILE_REGEX} on line {LINE_REGEX}$"
+        ),
     ),
 ]
 
@@ -462,10 +780,103 @@ EXCLUDE_FILE_PATTERN = re.compile(
     r")"
 )
 
+# Named groups that patterns may use
+PATTERN_GROUPS = {
+    "file_name",
+    "line",
+    "column",
+    "severity",
+    "message",
+    "confidence",
+    "file_group",
+    "file_endgroup",
+    "severity_group",
+    "severity_endgroup",
+    "classname",
+    "method",
+    "dataset",
+}
+
+# Placeholders that can be used in the patterns of pattern packs
+PACK_PLACEHOLDERS = {
+    "ANY": ANY_REGEX,
+    "FILE": FILE_REGEX,
+    "FILEGROUP": FILEGROUP_REGEX,
+    "EOL": EOL_REGEX,
+    "LINE": LINE_REGEX,
+    "COLUMN": COLUMN_REGEX,
+    "SEVERITY": SEVERITY_REGEX,
+    "SEVERITYGROUP": SEVERITYGROUP_REGEX,
+    "MSG": MSG_REGEX,
+    "MULTILINE_MSG": MULTILINE_MSG_REGEX,
+    "CONFIDENCE": CONFIDENCE_REGEX,
+    "IDENTIFIER": IDENTIFIER_REGEX,
+    "CLASS_METHOD": CLASS_METHOD_REGEX,
+}
+
+# Name and order of the family of PATTERNS among the pattern pack families
+BUILTIN_FAMILY = "builtin"
+BUILTIN_FAMILY_ORDER = 0
+# Default order of pattern pack families (before PATTERNS)
+PACK_FAMILY_ORDER = -1
+# Version of the pattern bundle format (part of the cache key)
+PATTERN_BUNDLE_VERSION = 4
+
+# Named group in a pattern source
+GROUP_NAME_REGEX = re.compile(r"\(\?P<(\w+)>")
+# Named groups that control the parsing and are not part of the notice
+CONTROL_GROUPS = frozenset(
+    (
+        "confidence",
+        "file_group",
+        "file_endgroup",
+        "severity_group",
+        "severity_endgroup",
+    )
+)
+
+# First character of a pattern: optional '^', then a literal character
+# (possibly escaped) which is not followed by an optional quantifier.
+DISPATCH_CHAR_REGEX = re.compile(
+    r"\^?(?:\\([^\w\s])|([^\\.^$*+?{}\[\]()|]))([*?{]?)"
+)
+
+# Number of lines read at once when parsing a stream
+STREAM_BLOCK_LINES = 1000
+# Number of lines kept as lookahead for multiline patterns when streaming
+STREAM_LOOKAHEAD_LINES = 100
+# Number of bytes read at once from a pipe, socket or terminal
+STREAM_READ_SIZE = 65536
+# Time without new input after which the pending notices are reported
+STREAM_IDLE_SECONDS = 0.2
+
 # Severities available in CodeSniffer report format
 SEVERITY_NOTICE = "notice"
 SEVERITY_WARNING = "warning"
 SEVERITY_ERROR = "error"
+# Order of the severities in summaries
+SEVERITY_ORDER = {SEVERITY_ERROR: 0, SEVERITY_WARNING: 1, SEVERITY_NOTICE: 2}
+
+# Normalized severity for the (lower case) severities found in logs
+SEVERITY_MAP = {
+    "info": SEVERITY_NOTICE,
+    "style": SEVERITY_NOTICE,
+    "notice": SEVERITY_NOTICE,
+    "warn": SEVERITY_WARNING,
+    "warning": SEVERITY_WARNING,
+    "fail": SEVERITY_ERROR,
+    "failure": SEVERITY_ERROR,
+    "error": SEVERITY_ERROR,
+}
+# Severity for the cpplint confidence levels (last one for 5 and more)
+CONFIDENCE_SEVERITIES = (
+    SEVERITY_NOTICE,
+    SEVERITY_NOTICE,
+    SEVERITY_WARNING,
+    SEVERITY_WARNING,
+    SEVERITY_WARNING,
+    SEVERITY_ERROR,
+)
 
 
 def strip_ansi(text: str):
@@ -475,178 +886,714 @@ def strip_ansi(text: str):
     return re.sub(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])", "", text)
 
 
+def get_pattern_source(pattern) -> str:
+    """
+    Get the source of a pattern in PATTERNS (string or compiled pattern,
+    possibly as (name, pattern)).
+    """
+    if isinstance(pattern, tuple):
+        pattern = pattern[1]
+    return getattr(pattern, "pattern", pattern)
+
+
+def get_pattern_name(pattern):
+    """
+    Get the name of a pattern in PATTERNS, None when it has no name.
+    """
+    return pattern[0] if isinstance(pattern, tuple) else None
+
+
+def get_dispatch_char(source):
+    """
+    Get the character (lowercase) that any match of the pattern starts with.
+
+    Returns None when that is not known (for instance when the pattern
+    starts with a class, a group or an optional character).
+    """
+    match = DISPATCH_CHAR_REGEX.match(source)
+    if match is None or match.group(3):
+        return None
+    # Alternation at the top level allows other first characters
+    depth = 0
+    escaped = in_class = False
+    for char in source:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return None
+    return (match.group(1) or match.group(2)).lower()
+
+
+def build_dispatch_index(sources):
+    """
+    Build the index of the patterns to try for a line by first character.
+
+    'chars' maps a first character to the indexes of the patterns that can
+    match, 'generic' lists the patterns to try for other characters.  The
+    indexes are in the order of the patterns.
+    """
+    dispatch_chars = [get_dispatch_char(source) for source in sources]
+    generic = [i for i, char in enumerate(dispatch_chars) if char is None]
+    chars = {
+        char: [i for i, c in enumerate(dispatch_chars) if c in (char, None)]
+        for char in set(dispatch_chars)
+        if char is not None
+    }
+    return {"chars": chars, "generic": generic}
+
+
+def build_pattern_bundle(sources, families=None, names=None):
+    """
+    Build the pattern bundle for a list of pattern sources.
+
+    The bundle is a dict with the pattern 'sources', the 'families'
+    ([name, first index, number of patterns]), the 'dispatch' index,
+    the named 'groups' of each pattern and its 'label' (the 'pattern' of
+    notices): its name, or 'family:number' for patterns without name.
+
+    :param names: Name of each pattern (or None), see get_pattern_name.
+    """
+    if families is None:
+        families = [[BUILTIN_FAMILY, 0, len(sources)]]
+    if names is None:
+        names = [None] * len(sources)
+    return {
+        "sources": list(sources),
+        "families": families,
+        "dispatch": build_dispatch_index(sources),
+        "groups": [
+            list(dict.fromkeys(GROUP_NAME_REGEX.findall(source)))
+            for source in sources
+        ],
+        "labels": [
+            names[start + number - 1] or f"{family}:{number}"
+            for family, start, count in families
+            for number in range(1, count + 1)
+        ],
+    }
+
+
+def get_pattern_bundle():
+    """
+    Get the pattern bundle for the current PATTERNS.
+
+    It is built on first use, and again when PATTERNS changed.  The
+    compiled patterns are added to the bundle when they are needed.
+    """
+    patterns = tuple(PATTERNS)
+    if getattr(get_pattern_bundle, "patterns", None) != patterns:
+        get_pattern_bundle.bundle = (  # type: ignore[attr-defined]
+            build_pattern_bundle(
+                [get_pattern_source(pattern) for pattern in patterns],
+                names=[get_pattern_name(pattern) for pattern in patterns],
+            )
+        )
+        get_pattern_bundle.patterns = patterns  # type: ignore[attr-defined]
+    return get_pattern_bundle.bundle  # type: ignore[attr-defined]
+
+
+@contextlib.contextmanager
+def use_pattern_bundle(bundle):
+    """
+    Use the patterns of the bundle as PATTERNS within the context.
+    """
+    saved_patterns = list(PATTERNS)
+    PATTERNS[:] = zip(bundle["labels"], bundle["sources"])
+    get_pattern_bundle.bundle = bundle  # type: ignore[attr-defined]
+    get_pattern_bundle.patterns = tuple(PATTERNS)  # type: ignore
+    try:
+        yield bundle
+    finally:
+        PATTERNS[:] = saved_patterns
+
+
+def get_compiled_patterns():
+    """
+    Get the PATTERNS compiled with 're'.
+
+    They are compiled on first use, and again when PATTERNS changed.
+    """
+    bundle = get_pattern_bundle()
+    if "compiled" not in bundle:
+        bundle["compiled"] = [
+            re.compile(source, re.IGNORECASE) for source in bundle["sources"]
+        ]
+    return bundle["compiled"]
+
+
+def get_full_regex():
+    """
+    Get the compiled alternation of all PATTERNS (requires 'regex').
+
+    The compiled expression is cached, and compiled again when PATTERNS
+    changed.  Each alternative ends with an empty marker group to find
+    the pattern that matched.  The group numbers of the markers and of
+    the named groups of each pattern are added to the bundle
+    ('full_markers', 'full_groups').
+    """
+    bundle = get_pattern_bundle()
+    if "full_regex" not in bundle:
+        # regex required to allow same group names
+        try:
+            import regex
+        except ImportError as exc:
+            raise ImportError(
+                "The 'parsefile' method requires 'python -m pip install regex'"
+            ) from exc
+
+        alternatives = "|".join(
+            f"(?:{source})(?P<_{index}>)"
+            for index, source in enumerate(bundle["sources"])
+        )
+        full_regex = regex.compile(
+            f"(?:{alternatives})", regex.MULTILINE | regex.IGNORECASE
+        )
+        bundle["full_markers"] = tuple(
+            full_regex.groupindex[f"_{index}"]
+            for index in range(len(bundle["sources"]))
+        )
+        bundle["full_groups"] = [
+            (tuple(names), tuple(full_regex.groupindex[n] for n in names))
+            for names in bundle["groups"]
+        ]
+        bundle["full_regex"] = full_regex
+    return bundle["full_regex"]
+
+
+def expand_pack_pattern(source):
+    """
+    Replace the {PLACEHOLDER}s in a pattern from a pattern pack.
+    """
+
+    def replace(match):
+        name = match.group(1)
+        if name not in PACK_PLACEHOLDERS:
+            raise ValueError(f"unknown placeholder {{{name}}}")
+        return PACK_PLACEHOLDERS[name]
+
+    return re.sub(r"\{([A-Z_]+)\}", replace, source)
+
+
+def validate_pack_pattern(source):
+    """
+    Check a pattern (after expansion), raise ValueError when invalid.
+    """
+    try:
+        compiled = re.compile(source)
+    except re.error as exc:
+        raise ValueError(f"invalid regular expression: {exc}") from exc
+    if not compiled.groupindex:
+        raise ValueError("no named group")
+    unknown_groups = set(compiled.groupindex) - PATTERN_GROUPS
+    if unknown_groups:
+        raise ValueError(
+            f"unknown group(s) {', '.join(sorted(unknown_groups))}"
+        )
+    if compiled.match("") is not None:
+        raise ValueError("matches an empty string")
+
+
+def read_pattern_pack(file_name, content):
+    """
+    Read and validate a pattern pack, return its families.
+
+    Each family is a dict with 'name', 'order' and the expanded 'patterns'.
+    """
+    import json
+
+    try:
+        pack = json.loads(content)
+    except ValueError as exc:
+        raise ValueError(f"{file_name}: invalid JSON: {exc}") from exc
+    if not isinstance(pack, dict) or not isinstance(
+        pack.get("families", None), list
+    ):
+        raise ValueError(f"{file_name}: 'families' list is missing")
+
+    families = []
+    for family in pack["families"]:
+        if not isinstance(family, dict) or not isinstance(
+            family.get("name", None), str
+        ):
+            raise ValueError(f"{file_name}: family without 'name'")
+        context = f"{file_name}: family '{family['name']}'"
+        order = family.get("order", PACK_FAMILY_ORDER)
+        if not isinstance(order, int):
+            raise ValueError(f"{context}: 'order' must be an integer")
+        patterns = family.get("patterns", None)
+        if not isinstance(patterns, list) or not patterns:
+            raise ValueError(f"{context}: 'patterns' list is missing")
+
+        sources = []
+        for index, pattern in enumerate(patterns):
+            if isinstance(pattern, list):
+                # Long patterns can be split in parts
+                pattern = "".join(pattern)
+            if not isinstance(pattern, str):
+                raise ValueError(f"{context}: pattern {index} is not a string")
+            try:
+                source = expand_pack_pattern(pattern)
+                validate_pack_pattern(source)
+            except ValueError as exc:
+                raise ValueError(f"{context}: pattern {index}: {exc}") from exc
+            sources.append(source)
+        families.append(
+            {"name": family["name"], "order": order, "patterns": sources}
+        )
+    return families
+
+
+def build_pack_bundle(packs):
+    """
+    Build the pattern bundle for PATTERNS and the pattern packs.
+
+    :param packs: List of (file name, content) of the pattern packs.
+    """
+    families: list[dict] = [
+        {
+            "name": BUILTIN_FAMILY,
+            "order": BUILTIN_FAMILY_ORDER,
+            "patterns": [get_pattern_source(pattern) for pattern in PATTERNS],
+            "names": [get_pattern_name(pattern) for pattern in PATTERNS],
+        }
+    ]
+    for file_name, content in packs:
+        for family in read_pattern_pack(file_name, content):
+            if any(family["name"] == other["name"] for other in families):
+                raise ValueError(
+                    f"{file_name}: family '{family['name']}' already exists"
+                )
+            families.append(family)
+
+    # Sort by order, keeping the order of definition for equal orders
+    families.sort(key=lambda family: family["order"])
+    sources: list[str] = []
+    names = []
+    bundle_families = []
+    for family in families:
+        bundle_families.append(
+            [family["name"], len(sources), len(family["patterns"])]
+        )
+        sources.extend(family["patterns"])
+        names.extend(family.get("names", [None] * len(family["patterns"])))
+    return build_pattern_bundle(sources, bundle_families, names)
+
+
+def get_pattern_cache_dir(environ=None):
+    """
+    Get the default directory where pattern bundles are cached.
+    """
+    if environ is None:
+        environ = os.environ
+    cache_dir = environ.get("LOGTOCS_CACHE_DIR", None)
+    if cache_dir is None:
+        cache_home = environ.get("XDG_CACHE_HOME", None) or os.path.join(
+            os.path.expanduser("~"), ".cache"
+        )
+        cache_dir = os.path.join(cache_home, "logToCs")
+    return cache_dir
+
+
+def load_pattern_packs(file_names, cache_dir=None):
+    """
+    Load pattern packs, return the pattern bundle to use.
+
+    The bundle is cached in `cache_dir` (when set) under the hash of the
+    content of the packs and of PATTERNS, so that the packs only need to
+    be validated once.
+    """
+    # pylint: disable=too-many-locals
+    import hashlib
+    import json
+
+    packs = []
+    for file_name in file_names:
+        with open(file_name, "rb") as pack_file:
+            packs.append((file_name, pack_file.read()))
+
+    digest = hashlib.sha256(f"{PATTERN_BUNDLE_VERSION}\0".encode())
+    for pattern in PATTERNS:
+        name, source = get_pattern_name(pattern), get_pattern_source(pattern)
+        digest.update(f"{name}\0{source}\0".encode("utf_8"))
+    for _file_name, content in packs:
+        digest.update(len(content).to_bytes(8, "big") + content)
+
+    cache_file = None
+    if cache_dir:
+        cache_file = os.path.join(
+            cache_dir, f"patterns-{digest.hexdigest()}.json"
+        )
+        try:
+            with open(cache_file, encoding="utf_8") as bundle_file:
+                return json.load(bundle_file)
+        except (OSError, ValueError):
+            pass  # Not cached (or invalid), build it
+
+    bundle = build_pack_bundle(packs)
+
+    if cache_file is not None:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            # Write to a temporary file to never expose a partial file
+            tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+            with open(tmp_file, "w", encoding="utf_8") as bundle_file:
+                json.dump(bundle, bundle_file)
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            pass  # Caching is optional
+    return bundle
+
+
 def parse_file(text):
     """
     Parse all messages in a file
 
     Returns the fields in a dict.
     """
-    # pylint: disable=too-many-branches,too-many-statements,too-many-locals
-    # regex required to allow same group names
-    try:
-        import regex  # pylint: disable=import-outside-toplevel
-    except ImportError as exc:
-        raise ImportError(
-            "The 'parsefile' method requires 'python -m pip install regex'"
-        ) from exc
-
-    patterns = [pattern.pattern for pattern in PATTERNS]
-    # patterns = [PATTERNS[0].pattern]
-
-    file_group = None  # The file name for the group (if any)
-    severity_group = None  # The severity for the group (if any)
-    full_regex = "(?:(?:" + (")|(?:".join(patterns)) + "))"
-    results = []
-
-    for fields in regex.finditer(
-        full_regex, strip_ansi(text), regex.MULTILINE | regex.IGNORECASE
-    ):
-        if not fields:
-            continue
-        result = fields.groupdict()
+    return list(iter_parse_file(text))
 
-        if len(result) == 0:
-            continue
 
-        severity = result.get("severity", None)
-        file_name = result.get("file_name", None)
-        confidence = result.pop("confidence", None)
-        new_file_group = result.pop("file_group", None)
-        file_endgroup = result.pop("file_endgroup", None)
-        new_severity_group = result.pop("severity_group", None)
-        severity_endgroup = result.pop("severity_endgroup", None)
-        message = result.get("message", None)
-        dataset = result.get("dataset", None)
-
-        # Some exclusions (false matches)
-        # Duration: From hurl log summary
-        if file_name == "Duration":
-            continue
+def iter_parse_file(text, state=None):
+    """
+    Parse all messages in a file, yielding the fields of each notice.
 
-        if dataset is not None:
-            if message is None:
-                message = ""
-            message += dataset
-            result["message"] = message
+    :param state: Optional dict holding the group state ('file_group',
+                  'severity_group').  It is updated in place so that
+                  parsing can continue over consecutive blocks of a log.
+    """
+    full_regex = get_full_regex()
+    bundle = get_pattern_bundle()
 
-        has_group_instructions = False
+    if state is None:
+        state = {}
 
-        if new_file_group is not None:
-            # Start of file_group, just store file
-            file_group = new_file_group
-            has_group_instructions = True
+    for fields in full_regex.finditer(strip_ansi(text)):
+        notice = match_to_notice(fields, state, bundle)
+        if notice is not None:
+            yield notice
 
-        if file_endgroup is not None:
-            file_group = None
-            has_group_instructions = True
 
-        if new_severity_group is not None:
-            # Start of file_group, just store file
-            severity_group = new_severity_group.lower()
-            has_group_instructions = True
+def match_to_notice(fields, state, bundle):
+    """
+    Convert a match of the full regex to a notice.
 
-        if severity_endgroup is not None:
-            severity_group = None
-            has_group_instructions = True
+    Only the named groups of the pattern that matched are read, the
+    pattern is found from the marker groups (see get_full_regex).
+    """
+    index = fields.group(0, *bundle["full_markers"]).index("", 1) - 1
+    names, numbers = bundle["full_groups"][index]
+    notice = groups_to_notice(zip(names, fields.group(0, *numbers)[1:]), state)
+    if notice is not None:
+        notice["pattern"] = bundle["labels"][index]
+    return notice
 
-        if has_group_instructions:
-            continue
 
+def groups_to_notice(groups, state):
+    """
+    Convert the named groups matched by a pattern to a notice.
+
+    This is the common stage for parse_file and parse_message.  Updates
+    the group state and returns None when the match does not result in a
+    notice (group instruction, exclusion, ...).
+
+    :param groups: (name, value) pairs of the named groups of the pattern.
+    :param state: Dict holding the group state ('file_group',
+                  'severity_group').
+    """
+    # pylint: disable=too-many-branches
+    notice = dict.fromkeys(NOTICE_FIELDS)
+    notice.update(groups)
+
+    file_name = notice["file_name"]
+    # Some exclusions (false matches)
+    # Duration: From hurl log summary
+    if file_name == "Duration":
+        return None
+
+    confidence = None
+    if not CONTROL_GROUPS.isdisjoint(notice):
+        confidence = notice.pop("confidence", None)
+        if update_group_state(notice, state):
+            return None
+
+    if file_name is None:
+        file_name = state.get("file_group", None)
         if file_name is None:
-            if file_group is not None:
-                file_name = file_group
-                result["file_name"] = file_name
-            else:
-                # No filename, skip
-                continue
-        else:
-            if EXCLUDE_FILE_PATTERN.search(file_name):
-                # This file_name is excluded
-                continue
+            # No filename, skip
+            return None
+        notice["file_name"] = file_name
+    elif EXCLUDE_FILE_PATTERN.search(file_name):
+        # This file_name is excluded
+        return None
 
-        if message is not None:
-            if EXCLUDE_MSG_PATTERN.search(message):
-                # This message is excluded
-                continue
+    message = notice["message"]
+    dataset = notice.get("dataset", None)
+    if dataset is not None:
+        message = dataset if message is None else message + dataset
+        notice["message"] = message
 
-        if confidence is not None:
-            # Convert confidence level of cpplint
-            # to warning, etc.
-            confidence = int(confidence)
+    if message is not None and EXCLUDE_MSG_PATTERN.search(message):
+        # This message is excluded
+        return None
 
-            if confidence <= 1:
-                severity = SEVERITY_NOTICE
-            elif confidence >= 5:
-                severity = SEVERITY_ERROR
-            else:
-                severity = SEVERITY_WARNING
+    severity = notice["severity"]
+    if confidence is not None:
+        # Convert confidence level of cpplint to warning, etc.
+        severity = CONFIDENCE_SEVERITIES[
+            min(int(confidence), len(CONFIDENCE_SEVERITIES) - 1)
+        ]
+    elif severity is None:
+        severity = state.get("severity_group", None)
+
+    if severity is None:
+        notice["severity"] = SEVERITY_ERROR
+    else:
+        severity = severity.lower()
+        notice["severity"] = SEVERITY_MAP.get(severity, severity)
 
-        if severity is None and severity_group is not None:
-            severity = severity_group
+    return notice
 
-        if message is not None:
-            if EXCLUDE_MSG_PATTERN.search(message):
-                # This message is excluded
-                continue
 
-        if severity is None:
-            severity = SEVERITY_ERROR
-        else:
-            severity = severity.lower()
+def update_group_state(notice, state):
+    """
+    Apply the group instructions of a notice to the group state.
 
-        if severity in ["info", "style"]:
-            severity = SEVERITY_NOTICE
-        elif severity in ["warning", "warn"]:
-            severity = SEVERITY_WARNING
-        elif severity in ["failure", "fail"]:
-            severity = SEVERITY_ERROR
+    The group fields are removed from the notice.  Returns True when the
+    notice holds group instructions.
+    """
+    new_file_group = notice.pop("file_group", None)
+    file_endgroup = notice.pop("file_endgroup", None)
+    new_severity_group = notice.pop("severity_group", None)
+    severity_endgroup = notice.pop("severity_endgroup", None)
+
+    if new_file_group is not None:
+        # Start of file_group, just store file
+        state["file_group"] = new_file_group
+    elif file_endgroup is not None:
+        state["file_group"] = None
+
+    if new_severity_group is not None:
+        # Start of severity_group, just store severity
+        state["severity_group"] = new_severity_group.lower()
+    elif severity_endgroup is not None:
+        state["severity_group"] = None
+
+    instructions = (
+        new_file_group,
+        file_endgroup,
+        new_severity_group,
+        severity_endgroup,
+    )
+    return instructions != (None, None, None, None)
 
-        result["severity"] = severity
 
-        results.append(result)
+def iter_parse_stream(
+    stream,
+    state=None,
+    block_lines=STREAM_BLOCK_LINES,
+    lookahead_lines=STREAM_LOOKAHEAD_LINES,
+    final=True,
+):
+    """
+    Parse messages from a text stream, yielding notices while reading.
 
-    return results
+    The stream is read by blocks of `block_lines` lines.  Matches ending
+    in the last `lookahead_lines` lines are only reported once more lines
+    are read, as the (multiline) match may still change.  For a pipe,
+    socket or terminal, what is available is read, and the matches are
+    reported when no input came for STREAM_IDLE_SECONDS (see
+    iter_stream_blocks).
 
+    :param final: When False, the stream may continue later (append-only
+                  log): the last `lookahead_lines` lines after the last
+                  match are kept in state ('pending', 'pending_pos') to
+                  be parsed again with the lines that follow.
 
-def parse_message(message):
+    Raises ImportError right away when the 'regex' module is missing.
     """
-    Parse message until it matches a pattern.
+    get_full_regex()
+    if state is None:
+        state = {}
+    return _iter_parse_stream(
+        stream,
+        state,
+        get_pattern_bundle(),
+        block_lines,
+        lookahead_lines,
+        final,
+    )
 
-    Returns the fields in a dict.
+
+def _iter_parse_stream(  # pylint: disable=too-many-arguments,too-many-positional-arguments  # noqa: E501
+    stream,
+    state,
+    bundle,
+    block_lines,
+    lookahead,
+    final,
+):
     """
-    for pattern in PATTERNS:
-        # print(pattern.pattern)  # Help for debug
-        fields = pattern.match(message, re.IGNORECASE)
-        # print(f"{fields!r} - {message}")  # Help for debug
-        if not fields:
-            continue
-        result = fields.groupdict()
-        if len(result) == 0:
+    Generator for iter_parse_stream.
+
+    :param bundle: The pattern bundle, with its full regex.
+    """
+    # pylint: disable=too-many-locals,too-many-branches
+    # Text that is not fully parsed yet
+    text = state.pop("pending", "")
+    # Position in text where the search continues
+    pos = state.pop("pending_pos", 0)
+    blocks = iter_stream_blocks(stream, block_lines)
+    eof = False
+    while not eof:
+        block, idle = next(blocks, (None, False))
+        eof = block is None
+        if block:
+            text += strip_ansi(block)
+
+        # Matches must end before `cut` to be reported now
+        cut = len(text)
+        if not eof and not idle:
+            for _ in range(lookahead):
+                cut = text.rfind("\n", 0, cut - 1) + 1
+                if cut <= pos:
+                    break
+        if cut <= pos:
             continue
 
-        if "confidence" in result:
-            # Convert confidence level of cpplint
-            # to warning, etc.
-            confidence = int(result["confidence"])
-            del result["confidence"]
+        resume = cut
+        for fields in bundle["full_regex"].finditer(text, pos):
+            if fields.end() > cut:
+                resume = min(fields.start(), cut)
+                break
+            pos = fields.end()
+            notice = match_to_notice(fields, state, bundle)
+            if notice is not None:
+                yield notice
+
+        if (eof and not final) or idle:
+            # The last lines after the last match may be the start of a
+            # record that is not complete yet
+            resume = len(text)
+            for _ in range(lookahead):
+                resume = text.rfind("\n", 0, resume - 1) + 1
+                if resume <= pos:
+                    break
+            resume = max(resume, pos)
+
+        # Drop the parsed text, keeping the start of the current line
+        # so that '^' still behaves as for the complete text.
+        keep = text.rfind("\n", 0, resume) + 1
+        text = text[keep:]
+        pos = resume - keep
+
+    if not final:
+        state["pending"] = text
+        state["pending_pos"] = pos
+
+
+def iter_stream_blocks(stream, block_lines):
+    """
+    Read text by blocks of complete lines, yielding (text, idle).
 
-            if confidence <= 1:
-                severity = SEVERITY_NOTICE
-            elif confidence >= 5:
-                severity = SEVERITY_ERROR
-            else:
-                severity = SEVERITY_WARNING
-            result["severity"] = severity
+    A pipe, socket or terminal is read as input comes (see
+    iter_live_blocks), idle is True when the producer paused.  Other
+    streams (or iterables of lines) are read by blocks of `block_lines`
+    lines, idle is always False.
+    """
+    if is_live_stream(stream):
+        yield from iter_live_blocks(stream)
+        return
+    while True:
+        lines = list(itertools.islice(stream, block_lines))
+        if lines:
+            yield "".join(lines), False
+        if len(lines) < block_lines:
+            return
 
-        if "severity" not in result:
-            result["severity"] = SEVERITY_ERROR
-        else:
-            result["severity"] = result["severity"].lower()
 
-        if result["severity"] in ["info", "style"]:
-            result["severity"] = SEVERITY_NOTICE
+def is_live_stream(stream) -> bool:
+    """
+    Tell if stream is a pipe, socket or terminal (not on Windows).
+    """
+    import stat
 
-        return result
+    if os.name == "nt":
+        # select() does not support pipes
+        return False
+    try:
+        mode = os.fstat(stream.fileno()).st_mode
+    except (AttributeError, OSError, ValueError):
+        return False
+    return stat.S_ISFIFO(mode) or stat.S_ISSOCK(mode) or stat.S_ISCHR(mode)
+
+
+def iter_live_blocks(stream):
+    """
+    Read a pipe, socket or terminal as input comes, yielding (text, idle).
+
+    The file descriptor is read directly (STREAM_READ_SIZE bytes at most)
+    and decoded like the text stream does.  The text ends with a complete
+    line, idle is True when no more input came within STREAM_IDLE_SECONDS.
+    """
+    import codecs
+    import io
+    import select
+
+    fd = stream.fileno()
+    decoder = io.IncrementalNewlineDecoder(
+        codecs.getincrementaldecoder(
+            getattr(stream, "encoding", None) or "utf_8"
+        )(getattr(stream, "errors", None) or "strict"),
+        translate=True,
+    )
+    partial = ""
+    while True:
+        data = os.read(fd, STREAM_READ_SIZE)
+        text = partial + decoder.decode(data, final=not data)
+        if not data:
+            if text:
+                yield text, False
+            return
+        end = text.rfind("\n") + 1
+        partial = text[end:]
+        ready, _, _ = select.select([fd], [], [], STREAM_IDLE_SECONDS)
+        yield text[:end], not ready
+
+
+def parse_message(message, state=None):
+    """
+    Parse message until it matches a pattern.
+
+    Returns the fields in a dict, or None when no pattern matches or the
+    match does not result in a notice (see groups_to_notice).
+
+    :param state: Optional dict holding the group state, to be passed
+                  again for the next lines.
+    """
+    compiled_patterns = get_compiled_patterns()
+    bundle = get_pattern_bundle()
+    dispatch = bundle["dispatch"]
+    if state is None:
+        state = {}
+    for index in dispatch["chars"].get(
+        message[:1].lower(), dispatch["generic"]
+    ):
+        fields = compiled_patterns[index].match(message)
+        if fields is not None:
+            notice = groups_to_notice(fields.groupdict().items(), state)
+            if notice is not None:
+                notice["pattern"] = bundle["labels"][index]
+            return notice
 
     # Nothing matched
     return None
@@ -666,6 +1613,8 @@ def add_error_entry(  # pylint: disable=too-many-arguments,unused-argument,too-m
     """
     Add error information to the CheckStyle output being created.
     """
+    import xml.etree.ElementTree as ET  # nosec
+
     file_element = find_or_create_file_element(
         root, file_name, root_path=root_path
     )
@@ -686,6 +1635,7 @@ def find_or_create_file_element(root, file_name: str, root_path=None):
     """
     Find/create file element in XML document tree.
     """
+    import xml.etree.ElementTree as ET  # nosec
 
     if root_path is not None:
         file_name = remove_prefix(file_name, root_path)
@@ -697,10 +1647,647 @@ def find_or_create_file_element(root, file_name: str, root_path=None):
     return file_element
 
 
-def main():  # pylint: disable=too-many-branches
+def iter_checkstyle_errors(source):
     """
-    Parse the script arguments and get the conversion done.
+    Read a CheckStyle report incrementally.
+
+    Yields (file_name, error attributes) where the attributes are a tuple
+    of (name, value) pairs, or None for a <file> without errors.
+    """
+    import xml.etree.ElementTree as ET  # nosec
+
+    root = None
+    file_name = None
+    has_errors = False
+    for event, elem in ET.iterparse(source, events=("start", "end")):  # nosec
+        if event == "start":
+            if root is None:
+                root = elem
+            elif elem.tag == "file":
+                file_name = elem.get("name")
+                has_errors = False
+        elif elem.tag == "error":
+            has_errors = True
+            yield file_name, tuple(elem.attrib.items())
+            elem.clear()
+        elif elem.tag == "file":
+            if not has_errors:
+                yield file_name, None
+            # Release the parsed elements
+            assert root is not None
+            root.clear()
+
+
+# Number of errors serialized at once when writing CheckStyle xml
+CHECKSTYLE_WRITE_BATCH = 1000
+
+
+def write_checkstyle(file_errors, stream):
+    """
+    Write CheckStyle xml to stream, one <file> element at a time.
+
+    The errors of a file are serialized by batches, so that a file with
+    many errors does not need to be held in memory.
+
+    :param file_errors: Iterable of (file_name, iterable of error
+                        attributes as (name, value) pairs), like
+                        convert_notices_to_checkstyle would output them.
+    """
+    import xml.etree.ElementTree as ET  # nosec
+
+    has_files = False
+    for file_name, errors in file_errors:
+        if not has_files:
+            stream.write(
+                "<?xml version='1.0' encoding='utf_8'?>\n"
+                '<checkstyle version="6.5">'
+            )
+            has_files = True
+        errors = iter(errors)
+        has_errors = False
+        while True:
+            file_element = ET.Element("file", name=file_name)
+            for attributes in itertools.islice(errors, CHECKSTYLE_WRITE_BATCH):
+                ET.SubElement(file_element, "error", dict(attributes))
+            if len(file_element) == 0:
+                break
+            text = ET.tostring(file_element, encoding="unicode")
+            # Keep the <file> tag for the first batch only
+            start = text.index(">") + 1 if has_errors else 0
+            stream.write(text[start : -len("</file>")])
+            has_errors = True
+        if has_errors:
+            stream.write("</file>")
+        else:
+            stream.write(ET.tostring(file_element, encoding="unicode"))
+    if has_files:
+        stream.write("</checkstyle>")
+    else:
+        stream.write(
+            "<?xml version='1.0' encoding='utf_8'?>\n"
+            '<checkstyle version="6.5" />'
+        )
+
+
+# Estimated memory used by a buffered error besides its strings (bytes)
+SPILL_ERROR_OVERHEAD = 200
+# Maximum number of spilled runs merged at once (bounds open files)
+SPILL_MERGE_FAN_IN = 64
+
+
+def notice_to_error_attributes(notice) -> tuple:
+    """
+    Get the CheckStyle error attributes for a notice as (name, value) pairs
+    """
+    attributes = [("severity", notice["severity"])]
+    for name in ("line", "column", "message", "source"):
+        if notice.get(name, None):
+            attributes.append((name, notice[name]))
+    return tuple(attributes)
+
+
+def write_checkstyle_bounded(notices, stream, max_memory, root_path=None):
+    """
+    Write notices as CheckStyle xml while buffering about max_memory bytes.
+
+    The report is the same as with convert_notices_to_checkstyle, see
+    iter_spill_sorted.
+    """
+
+    def iter_file_errors():
+        for notice in notices:
+            file_name = notice["file_name"]
+            if root_path is not None:
+                file_name = remove_prefix(file_name, root_path)
+            yield file_name, notice_to_error_attributes(notice)
+
+    write_checkstyle(iter_spill_sorted(iter_file_errors(), max_memory), stream)
+
+
+def iter_spill_sorted(file_errors, max_memory):
+    """
+    Group errors by file while buffering about max_memory bytes.
+
+    Errors are buffered per file.  When the buffer exceeds max_memory, it
+    is written to a temporary run sorted by file.  Runs are merged by
+    levels of SPILL_MERGE_FAN_IN runs, merged runs are closed (removed) at
+    once.  Only the file names are kept in memory for the complete input.
+
+    :param file_errors: Iterable of (file_name, error attributes as
+                        (name, value) pairs), attributes can be None to
+                        add a file without errors.
+    :return: Iterator of (file_name, iterator of error attributes) with the
+             files in order of first appearance and their errors in input
+             order.
+    """
+    # pylint: disable=too-many-locals
+    file_indexes: dict[str, int] = {}
+    buffer: dict[int, list[tuple]] = {}
+    size = 0
+    spilled = 0
+    levels: list[list] = []
+    try:
+        for file_name, attributes in file_errors:
+            index = file_indexes.setdefault(file_name, len(file_indexes))
+            if attributes is None:
+                continue
+            buffer.setdefault(index, []).append(attributes)
+            size += SPILL_ERROR_OVERHEAD
+            size += sum(len(value) for _name, value in attributes)
+            if size > max_memory:
+                add_spill_run(
+                    levels,
+                    write_spill_run(iter_buffer_entries(buffer, spilled)),
+                )
+                buffer = {}
+                size = 0
+                spilled += 1
+
+        # Keep at most SPILL_MERGE_FAN_IN runs for the final merge
+        level = 0
+        while sum(map(len, levels)) > SPILL_MERGE_FAN_IN:
+            if len(levels[level]) > 1:
+                merge_spill_level(levels, level)
+            level += 1
+
+        file_names = list(file_indexes)
+        runs = [
+            read_spill_run(run_file)
+            for run_files in levels
+            for run_file in run_files
+        ]
+        runs.append(iter_buffer_entries(buffer, spilled))
+        entries = merge_spill_runs(runs)
+        groups = itertools.groupby(entries, key=lambda entry: entry[0][0])
+        group = next(groups, None)
+        for index, file_name in enumerate(file_names):
+            if group is None or group[0] != index:
+                yield file_name, ()
+                continue
+            yield file_name, (attributes for _key, attributes in group[1])
+            group = next(groups, None)
+    finally:
+        for run_files in levels:
+            for run_file in run_files:
+                run_file.close()
+
+
+def add_spill_run(levels, run_file):
+    """
+    Add a run to the first level, merge the levels that are full
+    """
+    if not levels:
+        levels.append([])
+    levels[0].append(run_file)
+    level = 0
+    while len(levels[level]) >= SPILL_MERGE_FAN_IN:
+        merge_spill_level(levels, level)
+        level += 1
+
+
+def merge_spill_level(levels, level):
+    """
+    Merge the runs of a level into one run of the next level
+    """
+    runs = levels[level]
+    merged = write_spill_run(merge_spill_runs(map(read_spill_run, runs)))
+    levels[level] = []
+    for run_file in runs:
+        run_file.close()
+    if level + 1 == len(levels):
+        levels.append([])
+    levels[level + 1].append(merged)
+
+
+def iter_buffer_entries(buffer, run_number):
+    """
+    Yield the buffered errors as ((file index, run), attributes) by file
+    """
+    for index in sorted(buffer):
+        key = (index, run_number)
+        for attributes in buffer[index]:
+            yield key, attributes
+
+
+def write_spill_run(entries):
+    """
+    Write entries to a temporary file, return the file at its start.
+
+    The file is removed when it is closed.
+    """
+    import json
+    import tempfile
+
+    run_file = tempfile.TemporaryFile(
+        "w+", encoding="utf_8", errors="surrogateescape"
+    )
+    try:
+        for entry in entries:
+            run_file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        run_file.seek(0)
+    except BaseException:
+        run_file.close()
+        raise
+    return run_file
+
+
+def read_spill_run(run_file):
+    """
+    Iterate the ((file index, run), attributes) entries of a run file
+    """
+    import json
+
+    return (
+        (tuple(key), tuple(map(tuple, attributes)))
+        for key, attributes in map(json.loads, run_file)
+    )
+
+
+def merge_spill_runs(runs):
+    """
+    Merge runs of ((file index, run), attributes) ordered by key.
+    """
+    import heapq
+
+    return heapq.merge(*runs, key=lambda entry: entry[0])
+
+
+# Errors buffered in memory when merging CheckStyle reports (bytes)
+MERGE_MAX_MEMORY = 100_000_000
+
+
+def merge_checkstyle_reports(
+    sources, stream, dedup=False, max_memory=MERGE_MAX_MEMORY
+):
+    """
+    Merge CheckStyle reports and write the combined report to stream.
+
+    The reports are read incrementally, <file> entries with the same name
+    are coalesced in order of first appearance, with their errors in input
+    order.  About max_memory bytes of errors are buffered, more errors are
+    spilled to temporary files (see iter_spill_sorted).
+
+    :param dedup: When True, identical errors for a file are kept once.
+    """
+    import xml.etree.ElementTree as ET  # nosec
+
+    def iter_file_errors():
+        seen = set()
+        for source in sources:
+            try:
+                for file_name, attributes in iter_checkstyle_errors(source):
+                    if dedup and attributes is not None:
+                        key = hash((file_name, attributes))
+                        if key in seen:
+                            continue
+                        seen.add(key)
+                    yield file_name, attributes
+            except ET.ParseError as exc:
+                raise ValueError(f"{source}: {exc}") from exc
+
+    write_checkstyle(iter_spill_sorted(iter_file_errors(), max_memory), stream)
+
+
+def merge_gitlab_reports(sources, stream, dedup=False):
+    """
+    Merge GitLab code quality reports and write the result to stream.
+
+    The reports are read incrementally (see iter_json_array), notices are
+    written as they come.
+
+    :param dedup: When True, identical notices are kept once.
+    """
+    import json
+
+    seen = set()
+    separator = "["
+    for source in sources:
+        with open(source, encoding="utf_8") as report_file:
+            gl_report = iter_json_array(report_file)
+            try:
+                for gl_notice in gl_report:
+                    if dedup:
+                        key = hash(json.dumps(gl_notice, sort_keys=True))
+                        if key in seen:
+                            continue
+                        seen.add(key)
+                    stream.write(separator + json.dumps(gl_notice))
+                    separator = ", "
+            except ValueError as exc:
+                raise ValueError(f"{source}: {exc}") from exc
+    stream.write("[]" if separator == "[" else "]")
+
+
+# Number of characters read at once from a JSON report
+JSON_READ_SIZE = 65536
+JSON_NON_WHITESPACE_REGEX = re.compile(r"[^ \t\n\r]")
+
+
+def iter_json_array(stream):
+    """
+    Yield the items of the JSON array read from stream.
+
+    The text is read by chunks of JSON_READ_SIZE characters, only the
+    current item and chunk are kept in memory.
+    """
+    import json
+
+    decoder = json.JSONDecoder()
+    text = ""
+    position = 0
+    eof = False
+    # What can come next, "v" is a value
+    expected = "["
+    while expected:
+        match = JSON_NON_WHITESPACE_REGEX.search(text, position)
+        position = match.start() if match else len(text)
+        char = text[position : position + 1]
+        if char and char in expected.replace("v", ""):
+            position += 1
+            expected = {"[": "v]", ",": "v", "]": ""}[char]
+            continue
+        if char and "v" not in expected:
+            raise ValueError(
+                f"Expecting one of {expected!r} in JSON array,"
+                f" got {text[position : position + 20]!r}"
+            )
+        item = None
+        end = len(text)
+        if char:
+            try:
+                item, end = decoder.raw_decode(text, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+        # At the end of the text, the item may continue in the next chunk
+        if end < len(text) or (eof and char):
+            yield item
+            position = end
+            expected = ",]"
+            continue
+        if eof:
+            raise ValueError("Unexpected end of JSON array")
+        chunk = stream.read(JSON_READ_SIZE)
+        eof = not chunk
+        text = text[position:] + chunk
+        position = 0
+    rest = text[position:]
+    while rest or not eof:
+        if rest.strip():
+            raise ValueError("Extra data after JSON array")
+        rest = stream.read(JSON_READ_SIZE)
+        eof = not rest
+
+
+def get_report_format(source) -> str:
+    """
+    Get the format of a report from its first character.
+
+    :return: "checkstyle" (xml) or "gitlab" (JSON array)
+    """
+    with open(source, encoding="utf_8", errors="replace") as report_file:
+        for chunk in iter(lambda: report_file.read(JSON_READ_SIZE), ""):
+            chunk = chunk.lstrip(" \t\n\r\ufeff")
+            if chunk.startswith("<"):
+                return "checkstyle"
+            if chunk.startswith("["):
+                return "gitlab"
+            if chunk:
+                break
+    raise ValueError(
+        f"{source}: Not a CheckStyle (xml) or GitLab (JSON) report"
+    )
+
+
+def merge_reports(sources, stream, dedup=False, max_memory=MERGE_MAX_MEMORY):
+    """
+    Merge CheckStyle or GitLab reports, the format is detected.
+
+    Reports with different formats or that can not be parsed raise
+    ValueError.
+    """
+    formats = {get_report_format(source) for source in sources}
+    if len(formats) > 1:
+        raise ValueError("Can not merge CheckStyle and GitLab reports")
+    if formats == {"gitlab"}:
+        merge_gitlab_reports(sources, stream, dedup=dedup)
+    else:
+        merge_checkstyle_reports(
+            sources, stream, dedup=dedup, max_memory=max_memory
+        )
+
+
+# Version of the checkpoint format
+CHECKPOINT_VERSION = 1
+# Number of bytes at the start of a log that identify it (rotation check)
+CHECKPOINT_HEAD_BYTES = 4096
+
+
+def get_patterns_digest() -> str:
+    """
+    Get a digest of the current patterns, notices depend on them
+    """
+    import hashlib
+
+    digest = hashlib.sha256()
+    bundle = get_pattern_bundle()
+    for label, source in zip(bundle["labels"], bundle["sources"]):
+        digest.update(
+            f"{label}\0{source}\0".encode("utf_8", "surrogateescape")
+        )
+    return digest.hexdigest()
+
+
+def get_head_digest(log_file, size) -> str:
+    """
+    Get the digest of the first `size` bytes of a (binary) log file
+    """
+    import hashlib
+
+    log_file.seek(0)
+    return hashlib.sha256(log_file.read(size)).hexdigest()
+
+
+def read_checkpoint(checkpoint_name, log_file):
+    """
+    Read the checkpoint for a (binary) log file.
+
+    Returns a new checkpoint (parse from the start) when there is none or
+    when it does not apply: the log was truncated or rotated (the start
+    of the log differs), or the patterns changed.
+    """
+    # pylint: disable=too-many-return-statements
+    import json
+
+    new_checkpoint = {
+        "version": CHECKPOINT_VERSION,
+        "patterns": get_patterns_digest(),
+        "offset": 0,
+        "head_size": 0,
+        "head": get_head_digest(log_file, 0),
+        "state": {},
+        "notices_size": 0,
+    }
+    try:
+        with open(checkpoint_name, encoding="utf_8") as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+    except (OSError, ValueError):
+        return new_checkpoint
+
+    try:
+        if checkpoint["version"] != CHECKPOINT_VERSION:
+            return new_checkpoint
+        if checkpoint["patterns"] != new_checkpoint["patterns"]:
+            return new_checkpoint
+        if checkpoint["offset"] > os.fstat(log_file.fileno()).st_size:
+            return new_checkpoint  # Truncated
+        if checkpoint["head"] != get_head_digest(
+            log_file, checkpoint["head_size"]
+        ):
+            return new_checkpoint  # Rotated
+    except (KeyError, TypeError):
+        return new_checkpoint
+    return checkpoint
+
+
+def write_checkpoint(checkpoint_name, checkpoint, log_file):
+    """
+    Write the checkpoint for a (binary) log file.
+    """
+    import json
+
+    checkpoint["head_size"] = min(checkpoint["offset"], CHECKPOINT_HEAD_BYTES)
+    checkpoint["head"] = get_head_digest(log_file, checkpoint["head_size"])
+    # Write to a temporary file to never expose a partial file
+    tmp_name = f"{checkpoint_name}.{os.getpid()}.tmp"
+    with open(tmp_name, "w", encoding="utf_8") as checkpoint_file:
+        json.dump(checkpoint, checkpoint_file)
+    os.replace(tmp_name, checkpoint_name)
+
+
+def iter_checkpoint_lines(log_file, checkpoint):
+    """
+    Yield the complete lines of a (binary) log from the checkpoint offset.
+
+    The offset is moved past each line.  A last line without end of line
+    is left for the next run.
+    """
+    log_file.seek(checkpoint["offset"])
+    for line in log_file:
+        if not line.endswith(b"\n"):
+            break
+        checkpoint["offset"] += len(line)
+        # Universal newlines, as for the other inputs
+        yield line.decode("utf_8", "surrogateescape").replace(
+            "\r\n", "\n"
+        ).replace("\r", "\n")
+
+
+def parse_with_checkpoint(file_name, checkpoint_name, full=False):
+    """
+    Parse what was added to an append-only log since the last checkpoint.
+
+    The checkpoint (JSON) records the offset up to which the log was
+    parsed, the parser state (groups, pending multiline record) and a
+    digest of the start of the log.  The notices found are also cached in
+    `<checkpoint_name>.ndjson`.
+
+    Returns the new notices, or all the notices of the log when full.
+    """
+    notices_name = f"{checkpoint_name}.ndjson"
+    with open(file_name, "rb") as log_file:
+        checkpoint = read_checkpoint(checkpoint_name, log_file)
+        lines = iter_checkpoint_lines(log_file, checkpoint)
+        try:
+            notices = list(
+                iter_parse_stream(lines, checkpoint["state"], final=False)
+            )
+        except ImportError:
+            notices = list(iter_lines_to_notices(lines, checkpoint["state"]))
+
+        # Drop what a run that was interrupted may have added to the cache
+        with open(notices_name, "ab") as notices_file:
+            notices_file.truncate(checkpoint["notices_size"])
+        if full:
+            with open(
+                notices_name, encoding="utf_8", errors="surrogateescape"
+            ) as notices_file:
+                cached_notices = list(read_ndjson_notices(notices_file))
+        with open(
+            notices_name, "a", encoding="utf_8", errors="surrogateescape"
+        ) as notices_file:
+            write_ndjson_notices(notices, notices_file)
+        checkpoint["notices_size"] = os.path.getsize(notices_name)
+
+        write_checkpoint(checkpoint_name, checkpoint, log_file)
+
+    if full:
+        return cached_notices + notices
+    return notices
+
+
+def open_input(file_name, stdin=None):
+    """
+    Open input file for reading.  '-' is stdin (which is not closed).
+    """
+    if file_name == "-":
+        return contextlib.nullcontext(sys.stdin if stdin is None else stdin)
+    return open(file_name, encoding="utf_8", errors="surrogateescape")
+
+
+def open_output(file_name, output=None):
+    """
+    Open output file for writing.
+
+    Provides `output` instead when it is set, and None when there is no
+    output file.
+    """
+    if output is not None:
+        return contextlib.nullcontext(output)
+    if not file_name:
+        return contextlib.nullcontext(None)
+    return open(file_name, "w", encoding="utf_8")
+
+
+def ndjson_output(  # pylint: disable=too-many-arguments,too-many-positional-arguments  # noqa: E501
+    notices,
+    output_file=None,
+    github_annotate=False,
+    stdout=None,
+    environ=None,
+    max_annotations=None,
+    batch_size=NDJSON_BATCH_SIZE,
+):
     """
+    Stream notices as NDJSON to the output file and/or stdout.
+
+    As for the other formats, stdout is used unless annotating for github.
+    Annotations are printed while the notices are written.
+
+    :param batch_size: Number of notices written and flushed at once.
+    """
+    if stdout is None:
+        stdout = sys.stdout
+    streams = []
+    if output_file is not None:
+        streams.append(output_file)
+    if github_annotate:
+        notices = iter_annotated_notices(
+            notices, stdout, environ, max_annotations
+        )
+    else:
+        streams.append(stdout)
+    write_ndjson_notices(notices, *streams, batch_size=batch_size)
+
+
+def get_argument_parser(environ):
+    """
+    Get the parser for the script arguments.
+
+    :param environ: Environment mapping providing defaults.
+    """
+    import argparse
+
     parser = argparse.ArgumentParser(
         description="Convert messages to Checkstyle XML format."
     )
@@ -739,46 +2326,283 @@ def main():  # pylint: disable=too-many-branches
         "--github-annotate",
         action=argparse.BooleanOptionalAction,
         help="Annotate when in Github workflow.",
-        #  Future: (os.environ.get("GITHUB_EVENT_PATH", None) is not None),
-        default=os.environ.get("GITHUB_ACTIONS") == "true",
+        #  Future: (environ.get("GITHUB_EVENT_PATH", None) is not None),
+        default=environ.get("GITHUB_ACTIONS") == "true",
+    )
+    parser.add_argument(
+        "--max-annotations",
+        metavar="N",
+        type=int,
+        help="Maximum number of github annotations, the other notices are"
+        " only counted.  Use 0 for no limit.",
+        default=GH_MAX_ANNOTATIONS,
+    )
+    parser.add_argument(
+        "--github-summary",
+        action=argparse.BooleanOptionalAction,
+        help="Append a summary of the notices (Markdown) to"
+        " $GITHUB_STEP_SUMMARY.",
+        default=bool(environ.get("GITHUB_STEP_SUMMARY")),
     )
     parser.add_argument(
         "--gitlab",
         action=argparse.BooleanOptionalAction,
         help="Provide Gitlab Report Artifact (JSON)",
-        default=os.environ.get("GITLAB_CI") == "true",
+        default=environ.get("GITLAB_CI") == "true",
+    )
+    parser.add_argument(
+        "--ndjson",
+        action=argparse.BooleanOptionalAction,
+        help="Stream notices as NDJSON (one JSON object per line).",
+        default=False,
+    )
+    parser.add_argument(
+        "--ndjson-in",
+        action=argparse.BooleanOptionalAction,
+        help="Input is NDJSON notices (from --ndjson) instead of a log.",
+        default=False,
+    )
+    parser.add_argument(
+        "--checkpoint",
+        metavar="FILE",
+        help="Only parse what was added to the (append-only) input since"
+        " the checkpoint in FILE, and update it.  Only the new notices are"
+        " reported.",
+    )
+    parser.add_argument(
+        "--checkpoint-full",
+        action=argparse.BooleanOptionalAction,
+        help="With --checkpoint, report all the notices of the input"
+        " (the notices are cached in FILE.ndjson).",
+        default=False,
+    )
+    parser.add_argument(
+        "--merge",
+        metavar="REPORT",
+        nargs="+",
+        help="Merge CheckStyle or GitLab reports (detected from their"
+        " content) into one report.  Use -o to set the output file.",
+    )
+    parser.add_argument(
+        "--dedup",
+        action=argparse.BooleanOptionalAction,
+        help="Report identical notices only once.",
+        default=False,
+    )
+    parser.add_argument(
+        "--count",
+        action=argparse.BooleanOptionalAction,
+        help="Report identical notices once, with the number of occurrences"
+        " in the 'count' field (NDJSON).",
+        default=False,
+    )
+    parser.add_argument(
+        "--max-memory",
+        metavar="MB",
+        type=float,
+        help="Stream the CheckStyle report, buffering about MB megabytes of"
+        " errors in memory (100 with --merge).  More errors are spilled to"
+        " temporary files.",
     )
     parser.add_argument(
         "--name-only",
         action=argparse.BooleanOptionalAction,
         help="Report filenames only.",
-        #  Future: (os.environ.get("GITHUB_EVENT_PATH", None) is not None),
+        #  Future: (environ.get("GITHUB_EVENT_PATH", None) is not None),
         default=False,
     )
+    parser.add_argument(
+        "--patterns",
+        metavar="PACK",
+        action="append",
+        help="Load a pattern pack (JSON) with additional patterns."
+        "  Can be repeated.",
+    )
+    parser.add_argument(
+        "--pattern-cache",
+        metavar="DIR",
+        help="Directory where loaded pattern packs are cached."
+        "  Use '' to disable.",
+        default=get_pattern_cache_dir(environ),
+    )
 
-    args = parser.parse_args()
+    return parser
 
-    if args.input == "-" and args.input_named:
-        with open(
-            args.input_named, encoding="utf_8", errors="surrogateescape"
-        ) as input_file:
-            text = input_file.read()
-    elif args.input != "-":
-        with open(
-            args.input, encoding="utf_8", errors="surrogateescape"
-        ) as input_file:
-            text = input_file.read()
-    else:
-        text = sys.stdin.read()
+
+def run(  # pylint: disable=too-many-arguments,too-many-positional-arguments  # noqa: E501
+    argv=None,
+    environ=None,
+    stdin=None,
+    stdout=None,
+    output=None,
+):
+    """
+    Get the conversion done according to the script arguments.
+
+    :param argv: Script arguments (default: sys.argv[1:])
+    :param environ: Environment mapping (default: os.environ)
+    :param stdin: Stream read for input '-' (default: stdin)
+    :param stdout: Stream printed to (default: stdout)
+    :param output: Stream receiving the report instead of the output file
+    """
+    if environ is None:
+        environ = os.environ
+    if stdout is None:
+        stdout = sys.stdout
+
+    parser = get_argument_parser(environ)
+    args = parser.parse_args(argv)
+
+    if args.max_annotations < 0:
+        parser.error("--max-annotations must be 0 or more")
+
+    if args.checkpoint:
+        if args.input == "-" and not args.input_named:
+            parser.error("--checkpoint requires an input file")
+        if args.ndjson_in:
+            parser.error("--checkpoint can not be used with --ndjson-in")
+
+    summary_name = None
+    if args.github_summary and not args.merge:
+        summary_name = environ.get("GITHUB_STEP_SUMMARY", None)
+
+    with contextlib.ExitStack() as stack:
+        if args.patterns:
+            try:
+                bundle = load_pattern_packs(args.patterns, args.pattern_cache)
+            except (OSError, ValueError) as exc:
+                parser.error(str(exc))
+            stack.enter_context(use_pattern_bundle(bundle))
+        summary = stack.enter_context(gh_step_summary(summary_name))
+        try:
+            convert(args, environ, stdin, stdout, output, summary)
+        except (OSError, ValueError) as exc:
+            # Unreadable reports to merge are usage errors
+            if not args.merge:
+                raise
+            parser.error(str(exc))
+
+
+def convert(  # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-branches  # noqa: E501
+    args,
+    environ,
+    stdin,
+    stdout,
+    output,
+    summary=None,
+):
+    """
+    Get the conversion done for the parsed script arguments.
+
+    :param summary: Summary (see new_notice_summary) to update with the
+                    notices, or None.
+
+    See run() for the other parameters.
+    """
+    # pylint: disable=too-many-locals,too-many-statements
+    input_name = args.input
+    if input_name == "-" and args.input_named:
+        input_name = args.input_named
+
+    output_name = args.output
+    if output_name in ["-", ""]:
+        output_name = args.output_named
 
     root_path = os.path.join(args.root, "")
+    max_annotations = args.max_annotations or None
+    stream_checkstyle = args.max_memory is not None and not (
+        args.gitlab or args.name_only or args.ndjson
+    )
 
-    try:
-        notices = convert_text_to_notices(text)
-    except ImportError:
-        notices = convert_lines_to_notices(re.split(r"[\r\n]+", text))
+    if args.merge:
+        max_memory = MERGE_MAX_MEMORY
+        if args.max_memory is not None:
+            max_memory = int(args.max_memory * 1e6)
+        with open_output(output_name, output) as output_file:
+            if output_file is None:
+                output_file = stdout
+            merge_reports(
+                args.merge,
+                output_file,
+                dedup=args.dedup,
+                max_memory=max_memory,
+            )
+        return
+
+    with open_input(input_name, stdin) as input_file:
+        if args.ndjson_in:
+            notices = list(read_ndjson_notices(input_file))
+        elif args.checkpoint:
+            notices = parse_with_checkpoint(
+                input_name, args.checkpoint, full=args.checkpoint_full
+            )
+        elif (args.ndjson and not args.name_only) or stream_checkstyle:
+            # Stream the notices while the input is read
+            try:
+                notices = iter_parse_stream(input_file)
+            except ImportError:
+                notices = iter_lines_to_notices(input_file)
+            if args.dedup or args.count:
+                # Counts are not part of the CheckStyle report
+                notices = dedup_notices(
+                    notices, count=args.count and not stream_checkstyle
+                )
+            if summary is not None:
+                notices = iter_summarized_notices(notices, summary)
+            if stream_checkstyle:
+                convert_bounded(
+                    args, notices, output_name, output, environ, stdout
+                )
+                return
+            # Notices from a pipe are written as soon as they are found
+            batch_size = NDJSON_BATCH_SIZE
+            if is_live_stream(input_file):
+                batch_size = 1
+            with open_output(output_name, output) as output_file:
+                ndjson_output(
+                    notices,
+                    output_file,
+                    args.github_annotate,
+                    stdout=stdout,
+                    environ=environ,
+                    max_annotations=max_annotations,
+                    batch_size=batch_size,
+                )
+            return
+        else:
+            text = input_file.read()
+            try:
+                notices = convert_text_to_notices(text)
+            except ImportError:
+                notices = convert_lines_to_notices(re.split(r"[\r\n]+", text))
+        if args.dedup or args.count:
+            notices = list(dedup_notices(notices, count=args.count))
+        if summary is not None:
+            notices = list(iter_summarized_notices(notices, summary))
+
+    if stream_checkstyle:
+        convert_bounded(args, notices, output_name, output, environ, stdout)
+        return
+
+    if args.ndjson and not args.name_only:
+        with open_output(output_name, output) as output_file:
+            ndjson_output(
+                notices,
+                output_file,
+                args.github_annotate,
+                stdout=stdout,
+                environ=environ,
+                max_annotations=max_annotations,
+            )
+        return
+
+    if args.name_only:
+        print_filenames(notices, stream=stdout)
+        return
 
     if args.gitlab:
+        import json
+
         default_output = json.dumps(
             gl_notices(notices)  # , root_path=root_path
         )
@@ -787,25 +2611,63 @@ def main():  # pylint: disable=too-many-branches
             notices, root_path=root_path
         )
 
-    if args.name_only:
-        print_filenames(notices)
+    with open_output(output_name, output) as output_file:
+        if output_file is not None:
+            output_file.write(default_output)
+
+    if args.github_annotate:
+        gh_print_notices(
+            notices,
+            stream=stdout,
+            environ=environ,
+            max_annotations=max_annotations,
+        )
+        # checkrun = CheckRun()
+        # checkrun.submit(notices)
     else:
-        if args.output in ["-", ""]:
-            if args.output_named:
-                with open(
-                    args.output_named, "w", encoding="utf_8"
-                ) as output_file:
-                    output_file.write(default_output)
-        else:
-            with open(args.output, "w", encoding="utf_8") as output_file:
-                output_file.write(default_output)
+        print(default_output, file=stdout)
+
+
+def convert_bounded(  # pylint: disable=too-many-arguments,too-many-positional-arguments  # noqa: E501
+    args,
+    notices,
+    output_name,
+    output,
+    environ,
+    stdout,
+):
+    """
+    Stream the CheckStyle report with a memory cap (--max-memory).
 
-        if args.github_annotate:
-            gh_print_notices(notices)
-            # checkrun = CheckRun()
-            # checkrun.submit(notices)
+    The report is written to the output file, or to stdout when there is
+    no output file and no github annotations.  Annotations are printed
+    while the notices are read.
+    """
+    if args.github_annotate:
+        notices = iter_annotated_notices(
+            notices, stdout, environ, args.max_annotations or None
+        )
+
+    with open_output(output_name, output) as output_file:
+        if output_file is None and not args.github_annotate:
+            output_file = stdout
+        if output_file is None:
+            for _notice in notices:
+                pass
         else:
-            print(default_output)
+            write_checkstyle_bounded(
+                notices,
+                output_file,
+                int(args.max_memory * 1e6),
+                root_path=os.path.join(args.root, ""),
+            )
+
+
+def main():
+    """
+    Parse the script arguments and get the conversion done.
+    """
+    run()
 
 
 if __name__ == "__main__":
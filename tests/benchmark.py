@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+Benchmark logToCs on synthetic logs built from the logs in `IN`.
+
+The synthetic log amplifies the test logs (sqlfluff, phpunit, yamllint,
+eslint, phan, hurl, ...) up to the requested size.  Each case runs in its
+own process so that the peak RSS of a parser is that of the case.  The
+memory allocated by a case is measured with tracemalloc in an extra run.
+
+Examples:
+  tests/benchmark.py --size 20 --output baseline.json
+  tests/benchmark.py --size 20 --tools phpunit,eslint --baseline baseline.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None  # type: ignore[assignment]
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+IN_DIRECTORY = os.path.join(SCRIPT_DIR, "IN")
+LOGTOCS = os.path.join(SCRIPT_DIR, "..", "logToCs.py")
+
+sys.path.insert(0, os.path.join(SCRIPT_DIR, ".."))
+
+import logToCs  # noqa: E402  # pylint: disable=wrong-import-position
+
+# Line of `python -X importtime`: "import time: self | cumulative | module"
+IMPORT_TIME_REGEX = re.compile(r"^import time:\s+(\d+) \|\s+\d+ \|\s+(\S+)")
+
+
+def get_tools():
+    """
+    Get the names of the logs available to build a synthetic log
+    """
+    return sorted(
+        name[: -len(".log")]
+        for name in os.listdir(IN_DIRECTORY)
+        if name.endswith(".log")
+    )
+
+
+def generate_log(size, tools=None, seed=0):
+    """
+    Generate a log of about `size` bytes by amplifying the logs in `IN`.
+
+    :param tools: Names of the logs to use (all when None).
+    :param seed: Seed for the random order of the logs.
+    """
+    if tools is None:
+        tools = get_tools()
+    texts = []
+    for tool in tools:
+        with open(
+            os.path.join(IN_DIRECTORY, f"{tool}.log"),
+            encoding="utf_8",
+            errors="surrogateescape",
+        ) as log_file:
+            text = log_file.read()
+        if not text.endswith("\n"):
+            text += "\n"
+        texts.append(text)
+
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    while total < size:
+        text = rng.choice(texts)
+        parts.append(text)
+        total += len(text)
+    return "".join(parts)
+
+
+def write_log(path, size, tools=None, seed=0):
+    """
+    Write a synthetic log to path
+    """
+    with open(
+        path, "w", encoding="utf_8", errors="surrogateescape", newline=""
+    ) as log_file:
+        log_file.write(generate_log(size, tools, seed))
+
+
+def read_log(path):
+    """
+    Read the log like logToCs does
+    """
+    with open(path, encoding="utf_8", errors="surrogateescape") as log_file:
+        return log_file.read()
+
+
+def run_parse_file(text):
+    """
+    Case: parse the complete text
+    """
+    return len(logToCs.parse_file(text))
+
+
+def run_iter_parse_stream(text):
+    """
+    Case: parse the text as a stream
+    """
+    return sum(1 for _ in logToCs.iter_parse_stream(io.StringIO(text)))
+
+
+def run_convert_lines_to_notices(text):
+    """
+    Case: parse line by line (fallback without 'regex')
+    """
+    return len(logToCs.convert_lines_to_notices(re.split(r"[\r\n]+", text)))
+
+
+def run_checkstyle(notices):
+    """
+    Case: CheckStyle output
+    """
+    logToCs.convert_notices_to_checkstyle(notices)
+    return len(notices)
+
+
+def run_gitlab(notices):
+    """
+    Case: GitLab output
+    """
+    json.dumps(logToCs.gl_notices(notices))
+    return len(notices)
+
+
+def run_ndjson(notices):
+    """
+    Case: NDJSON output
+    """
+    return logToCs.write_ndjson_notices(notices, io.StringIO())
+
+
+def run_github(notices):
+    """
+    Case: GitHub annotations
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        logToCs.gh_print_notices(notices)
+    return len(notices)
+
+
+def run_dedup(notices):
+    """
+    Case: de-duplication of notices
+    """
+    for _notice in logToCs.dedup_notices(notices):
+        pass
+    return len(notices)
+
+
+# Cases that take the text of the log
+PARSER_CASES = {
+    "parse_file": run_parse_file,
+    "iter_parse_stream": run_iter_parse_stream,
+    "convert_lines_to_notices": run_convert_lines_to_notices,
+}
+
+# Cases that take the notices found in the log
+WRITER_CASES = {
+    "checkstyle": run_checkstyle,
+    "gitlab": run_gitlab,
+    "ndjson": run_ndjson,
+    "github": run_github,
+    "dedup": run_dedup,
+}
+
+
+def peak_rss_kb():
+    """
+    Get the peak resident set size of this process in kB
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak //= 1024  # Reported in bytes
+    return peak
+
+
+def run_case(case, log_path, repeat):
+    """
+    Run one case (in the current process), return the measurements.
+
+    The peak RSS is only given for the parsers: the notices for the
+    writers are parsed in the same process.  peak_alloc_kb is the peak
+    of the memory allocated by the case itself.
+    """
+    text = read_log(log_path)
+    if case in PARSER_CASES:
+        function = PARSER_CASES[case]
+        argument = text
+    else:
+        function = WRITER_CASES[case]
+        argument = logToCs.parse_file(text)
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        notices = function(argument)
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best:
+            best = seconds
+
+    # Separate run as tracing slows the case down
+    tracemalloc.start()
+    try:
+        function(argument)
+        peak_alloc = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "seconds": best,
+        "notices": notices,
+        "bytes": len(text.encode("utf_8", errors="surrogateescape")),
+        "peak_rss_kb": peak_rss_kb() if case in PARSER_CASES else None,
+        "peak_alloc_kb": peak_alloc // 1024,
+    }
+
+
+def measure_case(case, log_path, repeat):
+    """
+    Run a case in a new process and add the throughput figures.
+    """
+    output = subprocess.run(
+        [
+            sys.executable,
+            __file__,
+            "--run-case",
+            case,
+            "--log",
+            log_path,
+            "--repeat",
+            str(repeat),
+        ],
+        check=True,
+        stdout=subprocess.PIPE,
+    ).stdout
+    result = json.loads(output)
+    seconds = max(result["seconds"], 1e-9)
+    result["mb_per_s"] = result["bytes"] / seconds / 1e6
+    result["notices_per_s"] = result["notices"] / seconds
+    return result
+
+
+def get_script_environment():
+    """
+    Get the environment to run the script without CI defaults.
+
+    The GitHub and GitLab variables would enable the step summary (written
+    to the real file) and the GitLab output.
+    """
+    return {
+        key: value
+        for key, value in os.environ.items()
+        if not key.startswith("GITHUB_") and key != "GITLAB_CI"
+    }
+
+
+def get_import_times(command, input_data=b""):
+    """
+    Run python with `-X importtime`, return the self time of each import
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", *command],
+        check=True,
+        input=input_data,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        env=get_script_environment(),
+    ).stderr.decode("utf_8")
+    import_times = {}
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_REGEX.match(line)
+        if match:
+            import_times[match.group(2)] = int(match.group(1))
+    return import_times
+
+
+def measure_import_time(args=("--name-only",), input_data=b""):
+    """
+    Get the import times (us) of the script for the given arguments.
+
+    Modules that python imports anyway are not included.
+    """
+    interpreter = get_import_times(["-c", "pass"])
+    return {
+        module: self_us
+        for module, self_us in get_import_times(
+            [LOGTOCS, *args], input_data
+        ).items()
+        if module not in interpreter
+    }
+
+
+def measure_startup(repeat):
+    """
+    Measure the time to run the script on an empty input (best of repeat)
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, LOGTOCS, "--name-only"],
+            check=True,
+            input=b"",
+            stdout=subprocess.DEVNULL,
+            env=get_script_environment(),
+        )
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best:
+            best = seconds
+    import_us = sum(measure_import_time().values())
+    return {"seconds": best, "import_seconds": import_us / 1e6}
+
+
+def run_benchmark(size, tools=None, repeat=3, seed=0, cases=None):
+    """
+    Run the benchmark on a synthetic log, return the results
+    """
+    if cases is None:
+        cases = list(PARSER_CASES) + list(WRITER_CASES)
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "size": size,
+        "tools": tools if tools is not None else get_tools(),
+        "seed": seed,
+        "cases": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_path = os.path.join(tmp_dir, "synthetic.log")
+        write_log(log_path, size, tools, seed)
+        for case in cases:
+            results["cases"][case] = measure_case(case, log_path, repeat)
+    results["cases"]["startup"] = measure_startup(repeat)
+    return results
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Compare results to a baseline, return the list of regressions.
+
+    A case regresses when its time, peak RSS or peak allocated memory
+    exceeds the baseline by more than `tolerance` (relative).
+    """
+    regressions = []
+    for case, result in results["cases"].items():
+        reference = baseline.get("cases", {}).get(case, None)
+        if reference is None:
+            continue
+        for metric in (
+            "seconds",
+            "import_seconds",
+            "peak_rss_kb",
+            "peak_alloc_kb",
+        ):
+            value = result.get(metric, None)
+            reference_value = reference.get(metric, None)
+            if not value or not reference_value:
+                continue
+            if value > reference_value * (1 + tolerance):
+                regressions.append(
+                    f"{case}: {metric} {value:.6g} > {reference_value:.6g}"
+                    f" (+{(value / reference_value - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def print_results(results):
+    """
+    Print a summary of the results
+    """
+    for case, result in results["cases"].items():
+        line = f"{case:25} {result['seconds'] * 1000:10.1f} ms"
+        if "mb_per_s" in result:
+            line += (
+                f" {result['mb_per_s']:8.2f} MB/s"
+                f" {result['notices_per_s']:12.0f} notices/s"
+            )
+        if "import_seconds" in result:
+            line += f" ({result['import_seconds'] * 1000:.1f} ms imports)"
+        if result.get("peak_rss_kb", None) is not None:
+            line += f" {result['peak_rss_kb'] / 1024:8.1f} MB RSS"
+        if result.get("peak_alloc_kb", None) is not None:
+            line += f" {result['peak_alloc_kb'] / 1024:8.1f} MB allocated"
+        print(line)
+
+
+def main():
+    """
+    Parse the arguments and run the benchmark.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--size",
+        type=float,
+        default=5,
+        help="Size of the synthetic log in MB.",
+    )
+    parser.add_argument(
+        "--tools",
+        help="Comma separated list of logs from IN to use (default: all).",
+    )
+    parser.add_argument(
+        "--cases",
+        help="Comma separated list of cases to run (default: all).",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write the results to this file.")
+    parser.add_argument(
+        "--baseline", help="Compare to the results in this file."
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Relative increase that is reported as a regression.",
+    )
+    parser.add_argument("--generate", help="Only write a synthetic log.")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--log", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    size = int(args.size * 1e6)
+    tools = args.tools.split(",") if args.tools else None
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, args.log, args.repeat)))
+        return 0
+
+    if args.generate:
+        write_log(args.generate, size, tools, args.seed)
+        return 0
+
+    cases = args.cases.split(",") if args.cases else None
+    results = run_benchmark(size, tools, args.repeat, args.seed, cases)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf_8") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf_8") as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
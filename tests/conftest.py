@@ -0,0 +1,8 @@
+"""
+Shared pytest configuration: make logToCs importable from the tests.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
@@ -0,0 +1,44 @@
+"""
+Test the benchmark tooling (synthetic logs, baseline comparison).
+"""
+
+import benchmark
+
+
+def test_generate_log():
+    """
+    The synthetic log has the requested size and the requested tools only
+    """
+    text = benchmark.generate_log(10000, tools=["eslint", "yamllint"])
+    assert len(text) >= 10000
+    assert "##[error]" in text and "There were" not in text
+    assert text == benchmark.generate_log(10000, tools=["eslint", "yamllint"])
+
+
+def test_run_case(tmp_path):
+    """
+    A case reports the number of notices found
+    """
+    log_path = str(tmp_path / "synthetic.log")
+    benchmark.write_log(log_path, 5000, tools=["emacs"])
+    result = benchmark.run_case("parse_file", log_path, repeat=1)
+    assert result["notices"] > 0
+    assert result["bytes"] >= 5000
+    assert result["peak_alloc_kb"] >= 0
+
+    # The RSS of a writer would be that of the parser
+    result = benchmark.run_case("checkstyle", log_path, repeat=1)
+    assert result["peak_rss_kb"] is None
+    assert result["peak_alloc_kb"] > 0
+
+
+def test_compare():
+    """
+    Only slower or bigger cases are regressions
+    """
+    baseline = {"cases": {"a": {"seconds": 1.0, "peak_rss_kb": 1000}}}
+    results = {"cases": {"a": {"seconds": 1.1, "peak_rss_kb": 1500}}}
+    assert benchmark.compare(results, baseline, tolerance=0.2) == [
+        "a: peak_rss_kb 1500 > 1000 (+50%)"
+    ]
+    assert not benchmark.compare(results, baseline, tolerance=0.5)
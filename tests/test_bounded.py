@@ -0,0 +1,138 @@
+"""
+Test the bounded-memory CheckStyle output (spill to disk).
+"""
+
+import io
+import os
+import random
+import tempfile
+
+import pytest
+from test_in_out import get_environment, get_test_files, read_expected
+
+import logToCs
+
+
+def make_notices(count, files=20, seed=0):
+    """
+    Make notices for files in random order
+    """
+    rng = random.Random(seed)
+    return [
+        {
+            "file_name": f"src/file{rng.randrange(files)}.c",
+            "line": str(i),
+            "column": rng.choice([None, "3"]),
+            "severity": rng.choice(["error", "warning"]),
+            "message": f"Message <{i}> & \"{'x' * rng.randrange(50)}\"",
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize("max_memory", [0, 1000, 10**9])
+def test_bounded_equals_in_memory(monkeypatch, max_memory):
+    """
+    The spilled report is the same as the report built in memory
+    """
+    monkeypatch.setattr(logToCs, "SPILL_MERGE_FAN_IN", 3)
+    monkeypatch.setattr(logToCs, "CHECKSTYLE_WRITE_BATCH", 7)
+    notices = make_notices(500)
+    stream = io.StringIO()
+    logToCs.write_checkstyle_bounded(
+        iter(notices), stream, max_memory, root_path="src/"
+    )
+    expected = logToCs.convert_notices_to_checkstyle(notices, root_path="src/")
+    assert stream.getvalue() == expected
+
+
+def test_bounded_open_files(monkeypatch):
+    """
+    Merged runs are closed, open runs stay bounded by the merge levels
+    """
+    monkeypatch.setattr(logToCs, "SPILL_MERGE_FAN_IN", 4)
+    run_files = []
+    max_open = 0
+
+    def temporary_file(*args, **kwargs):
+        nonlocal max_open
+        run_files.append(open_temporary_file(*args, **kwargs))
+        max_open = max(
+            max_open, sum(not run_file.closed for run_file in run_files)
+        )
+        return run_files[-1]
+
+    open_temporary_file = tempfile.TemporaryFile
+    monkeypatch.setattr(tempfile, "TemporaryFile", temporary_file)
+    notices = make_notices(2000)
+    stream = io.StringIO()
+    logToCs.write_checkstyle_bounded(iter(notices), stream, 0)
+    assert stream.getvalue() == logToCs.convert_notices_to_checkstyle(notices)
+    # 2000 runs need 5 levels of 4 runs
+    assert len(run_files) > 2000
+    assert max_open <= 4 * 5 + 1
+    assert all(run_file.closed for run_file in run_files)
+
+
+def test_bounded_empty():
+    """
+    No notices gives an empty report
+    """
+    stream = io.StringIO()
+    logToCs.write_checkstyle_bounded(iter(()), stream, 0)
+    assert stream.getvalue() == logToCs.convert_notices_to_checkstyle([])
+
+
+@pytest.mark.parametrize("input_file", get_test_files(), ids=os.path.basename)
+def test_max_memory_option(input_file):
+    """
+    --max-memory gives the expected report and annotations
+    """
+    output = io.StringIO()
+    stdout = io.StringIO()
+    logToCs.run(
+        [input_file, "--max-memory", "0.0005"],
+        environ=get_environment(),
+        stdout=stdout,
+        output=output,
+    )
+    expected_xml, expected_txt = read_expected(input_file)
+    assert output.getvalue().encode("utf_8") == expected_xml
+    assert stdout.getvalue().encode("utf_8") == expected_txt
+
+
+@pytest.mark.parametrize("option", ["--checkpoint", "--ndjson-in"])
+def test_max_memory_notice_lists(monkeypatch, tmp_path, option):
+    """
+    --max-memory applies to checkpointed logs and NDJSON input
+    """
+    input_file = get_test_files()[0]
+    if option == "--checkpoint":
+        options = [input_file, option, str(tmp_path / "checkpoint.json")]
+    else:
+        ndjson = io.StringIO()
+        logToCs.run([input_file, "--ndjson"], environ={}, output=ndjson)
+        ndjson_file = tmp_path / "notices.ndjson"
+        ndjson_file.write_text(ndjson.getvalue(), encoding="utf_8")
+        options = [str(ndjson_file), option]
+
+    calls = []
+    write_checkstyle_bounded = logToCs.write_checkstyle_bounded
+
+    def spy(notices, stream, max_memory, root_path=None):
+        calls.append(max_memory)
+        write_checkstyle_bounded(notices, stream, max_memory, root_path)
+
+    monkeypatch.setattr(logToCs, "write_checkstyle_bounded", spy)
+    output = io.StringIO()
+    stdout = io.StringIO()
+    logToCs.run(
+        [*options, "--max-memory", "0.0005"],
+        environ=get_environment(),
+        stdout=stdout,
+        output=output,
+    )
+    assert calls == [500]
+    expected_xml, expected_txt = read_expected(input_file)
+    assert output.getvalue().encode("utf_8") == expected_xml
+    assert stdout.getvalue().encode("utf_8") == expected_txt
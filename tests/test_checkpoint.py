@@ -0,0 +1,138 @@
+"""
+Test the incremental parsing of append-only logs with a checkpoint.
+"""
+
+import io
+import random
+
+import pytest
+from test_in_out import get_environment, get_test_files, read_expected
+
+import logToCs
+
+
+def read_logs():
+    """
+    Get the concatenation of all test logs
+    """
+    data = b""
+    for input_file in get_test_files():
+        with open(input_file, "rb") as log_file:
+            data += log_file.read()
+    return data + b"\n"
+
+
+def append(path, data):
+    """
+    Append data to the log
+    """
+    with open(path, "ab") as log_file:
+        log_file.write(data)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental(tmp_path, seed):
+    """
+    Parsing a growing log gives the notices of parsing it at once
+    """
+    data = read_logs()
+    log = str(tmp_path / "build.log")
+    checkpoint = str(tmp_path / "checkpoint.json")
+    rng = random.Random(seed)
+    append(log, b"")
+    notices = []
+    pos = 0
+    while pos < len(data):
+        size = rng.randrange(1, 3000)
+        append(log, data[pos : pos + size])
+        pos += size
+        notices += logToCs.parse_with_checkpoint(log, checkpoint)
+
+    with open(log, encoding="utf_8", errors="surrogateescape") as log_file:
+        expected = logToCs.parse_file(log_file.read())
+    assert notices == expected
+
+
+def test_checkpoint_option(tmp_path):
+    """
+    Only new notices are reported, or all of them with --checkpoint-full
+    """
+    input_file = get_test_files()[0]
+    with open(input_file, "rb") as log_file:
+        data = log_file.read()
+    log = str(tmp_path / "build.log")
+    checkpoint = str(tmp_path / "checkpoint.json")
+    options = [log, "--checkpoint", checkpoint, "--ndjson"]
+
+    def run(*extra_options):
+        output = io.StringIO()
+        logToCs.run(
+            [*options, *extra_options],
+            environ=get_environment(),
+            stdout=io.StringIO(),
+            output=output,
+        )
+        return output.getvalue().splitlines()
+
+    half = data.index(b"\n", len(data) // 2) + 1
+    append(log, data[:half])
+    first = run()
+    append(log, data[half:])
+    second = run()
+    assert first and second
+    assert run() == []
+    assert run("--checkpoint-full") == first + second
+
+    # Full report
+    output = io.StringIO()
+    logToCs.run(
+        [log, "--checkpoint", checkpoint, "--checkpoint-full"],
+        environ=get_environment(),
+        stdout=io.StringIO(),
+        output=output,
+    )
+    expected_xml, _expected_txt = read_expected(input_file)
+    assert output.getvalue().encode("utf_8") == expected_xml
+
+
+@pytest.mark.parametrize("rotate", [False, True])
+def test_invalidation(tmp_path, rotate):
+    """
+    The checkpoint is not used when the log was truncated or rotated
+    """
+    data = read_logs()
+    log = str(tmp_path / "build.log")
+    checkpoint = str(tmp_path / "checkpoint.json")
+    append(log, data)
+    assert logToCs.parse_with_checkpoint(log, checkpoint)
+    assert not logToCs.parse_with_checkpoint(log, checkpoint)
+
+    new_data = data[::-1] if rotate else data[: len(data) // 2]
+    with open(log, "wb") as log_file:
+        log_file.write(new_data)
+    with open(log, encoding="utf_8", errors="surrogateescape") as log_file:
+        expected = logToCs.parse_file(log_file.read())
+    assert logToCs.parse_with_checkpoint(log, checkpoint) == expected
+    all_notices = logToCs.parse_with_checkpoint(log, checkpoint, full=True)
+    assert len(all_notices) == len(expected)
+
+
+def test_interrupted_run(tmp_path):
+    """
+    Notices cached by an interrupted run are dropped
+    """
+    log = str(tmp_path / "build.log")
+    checkpoint = str(tmp_path / "checkpoint.json")
+    append(log, read_logs())
+    notices = logToCs.parse_with_checkpoint(log, checkpoint)
+    append(f"{checkpoint}.ndjson", b'{"file_name":"x","severity":"error"}\n')
+    all_notices = logToCs.parse_with_checkpoint(log, checkpoint, full=True)
+    assert len(all_notices) == len(notices)
+
+
+def test_checkpoint_stdin():
+    """
+    The checkpoint requires an input file
+    """
+    with pytest.raises(SystemExit):
+        logToCs.run(["--checkpoint", "checkpoint.json"], environ={})
@@ -0,0 +1,61 @@
+"""
+Test the de-duplication of notices.
+"""
+
+import tracemalloc
+
+import logToCs
+
+
+def make_notice(index, message="Some message"):
+    """
+    Create a notice as parse_file returns it
+    """
+    return {
+        "file_name": f"src/file{index % 10}.py",
+        "line": str(index),
+        "column": None,
+        "severity": "error",
+        "message": message,
+    }
+
+
+def test_dedup_keeps_first_occurrence():
+    """
+    Identical notices are reported once, in order of appearance
+    """
+    notices = [make_notice(1), make_notice(2), make_notice(1)]
+    notices.append(make_notice(2, message="Other message"))
+    result = list(logToCs.dedup_notices(iter(notices)))
+    assert result == [notices[0], notices[1], notices[3]]
+
+
+def test_dedup_count():
+    """
+    Occurrences are counted, counts from earlier runs are added up
+    """
+    notices = [make_notice(1), make_notice(2), make_notice(1)]
+    notices.append(dict(make_notice(2), count=3))
+    result = list(logToCs.dedup_notices(notices, count=True))
+    assert [notice["count"] for notice in result] == [2, 4]
+
+
+def test_dedup_memory_per_unique_notice():
+    """
+    Memory used per unique notice does not depend on the message length
+    """
+    message = "x" * 1000
+    notices = [make_notice(index, message) for index in range(100000)]
+
+    current = 0
+    tracemalloc.start()
+    try:
+        unique_notices = logToCs.dedup_notices(notices)
+        for index, _notice in enumerate(unique_notices, 1):
+            if index == len(notices):
+                # Measure while the hash set is still alive
+                current, _peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert current / len(notices) < 120
@@ -0,0 +1,133 @@
+"""
+Test the github annotations and step summary.
+"""
+
+import io
+import os
+
+import pytest
+from test_in_out import IN_DIRECTORY, get_environment
+
+import logToCs
+
+
+def make_notices(count):
+    """
+    Make notices for a few files
+    """
+    return [
+        {
+            "file_name": f"src/file{i % 4}.c",
+            "line": str(i + 1),
+            "column": None,
+            "severity": ("error", "warning", "notice")[i % 3],
+            "message": f"Message {i}: 100% wrong,\nreally",
+            "pattern": "eslint",
+        }
+        for i in range(count)
+    ]
+
+
+def test_escape():
+    """
+    Data and properties are escaped for workflow commands
+    """
+    assert logToCs.gh_escape_data("a%b\r\nc:d,e") == "a%25b%0D%0Ac:d,e"
+    assert logToCs.gh_escape_property("a%b\r\nc:d,e") == "a%25b%0D%0Ac%3Ad%2Ce"
+    assert logToCs.gh_escape_data(None) is None
+
+
+@pytest.mark.parametrize("batch_size", [1, 3, 100])
+def test_annotation_limit(monkeypatch, batch_size):
+    """
+    Annotations are limited, the other notices are counted
+    """
+    monkeypatch.setattr(logToCs, "GH_ANNOTATION_BATCH_SIZE", batch_size)
+    stream = io.StringIO()
+    logToCs.gh_print_notices(
+        make_notices(10), stream=stream, environ={}, max_annotations=4
+    )
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 5
+    assert lines[0] == (
+        "::error file=src/file0.c,line=1::Message 0: 100%25 wrong,%0Areally"
+    )
+    assert lines[-1] == (
+        "::notice::6 more notices were not annotated (limit: 4)"
+    )
+
+
+def test_no_annotation_limit():
+    """
+    All notices are annotated without limit
+    """
+    stream = io.StringIO()
+    logToCs.gh_print_notices(make_notices(10), stream=stream, environ={})
+    assert len(stream.getvalue().splitlines()) == 10
+
+
+def test_negative_annotation_limit():
+    """
+    A negative annotation limit is a usage error
+    """
+    with pytest.raises(SystemExit):
+        logToCs.run(["--max-annotations", "-1"], environ={})
+
+
+def test_summary():
+    """
+    Notices are counted per severity, file and pattern
+    """
+    summary = logToCs.new_notice_summary()
+    notices = list(logToCs.iter_summarized_notices(make_notices(10), summary))
+    assert len(notices) == 10
+    assert summary["total"] == 10
+    assert summary["severities"] == {"error": 4, "warning": 3, "notice": 3}
+    assert summary["files"]["src/file2.c"] == {"error": 1, "notice": 1}
+    assert summary["patterns"] == {"eslint": 10}
+
+    markdown = logToCs.format_notice_summary(summary, top_files=3)
+    assert markdown.splitlines() == [
+        "### 10 notices",
+        "",
+        "| Severity | Notices |",
+        "| --- | ---: |",
+        "| error | 4 |",
+        "| warning | 3 |",
+        "| notice | 3 |",
+        "",
+        "#### Top 3 of 4 files",
+        "",
+        "| File | Notices | error | warning | notice |",
+        "| --- | ---: | ---: | ---: | ---: |",
+        "| src/file0.c | 3 | 1 | 1 | 1 |",
+        "| src/file1.c | 3 | 1 | 1 | 1 |",
+        "| src/file2.c | 2 | 1 | 0 | 1 |",
+        "",
+        "| Pattern | Notices |",
+        "| --- | ---: |",
+        "| eslint | 10 |",
+    ]
+
+
+@pytest.mark.parametrize("options", [[], ["--ndjson"], ["--max-memory", "1"]])
+def test_step_summary(tmp_path, options):
+    """
+    The summary is appended to $GITHUB_STEP_SUMMARY for all outputs
+    """
+    summary_file = tmp_path / "summary.md"
+    summary_file.write_text("Before\n", encoding="utf_8")
+    environ = get_environment()
+    environ["GITHUB_STEP_SUMMARY"] = str(summary_file)
+    stdout = io.StringIO()
+    logToCs.run(
+        [os.path.join(IN_DIRECTORY, "phpunit.log"), *options],
+        environ=environ,
+        stdout=stdout,
+        output=io.StringIO(),
+    )
+    lines = summary_file.read_text(encoding="utf_8").splitlines()
+    assert lines[:2] == ["Before", "### 20 notices"]
+    assert "| error | 20 |" in lines
+    assert "| phpunit | 20 |" in lines
+    assert stdout.getvalue().count("::error ") == 20
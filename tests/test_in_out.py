@@ -3,6 +3,7 @@
 Test log files in IN path versus expected outputs.
 """
 
+import io
 import os
 import subprocess
 import sys
@@ -10,98 +11,109 @@ from glob import glob
 
 import pytest
 
-# We do not want those for the test (unless we set them ourselves)
-for k, _v in os.environ.items():
-    if k.startswith("GITHUB_"):
-        del os.environ[k]
+import logToCs
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+IN_DIRECTORY = os.path.join(SCRIPT_DIR, "IN")
+OUT_DIRECTORY = os.path.join(SCRIPT_DIR, "OUT")
+
+
+def get_environment():
+    """
+    Get the environment for the program under test.
+
+    We do not want the GITHUB_ variables or GITLAB_CI for the test (unless
+    we set them ourselves).
+    """
+    environ = {
+        k: v
+        for k, v in os.environ.items()
+        if not k.startswith("GITHUB_") and k != "GITLAB_CI"
+    }
+    environ["GITHUB_ACTIONS"] = "true"
+    return environ
 
 
 # Function to get the list of test files in the 'IN' directory
-def get_test_files(in_directory="IN"):
+def get_test_files(in_directory=IN_DIRECTORY):
     """
     Read all test input files from given directory
     """
-    return glob(os.path.join(in_directory, "*.log"))
+    return sorted(glob(os.path.join(in_directory, "*.log")))
 
 
-# Function to run the program and capture stdout to a file
-def run_program(input_file, xml_file, output_file):
+def read_expected(input_file):
     """
-    Run our program under test
+    Read the expected xml report and stdout for the input file
     """
-    # Set the environment variable before running the subprocess
-    os.environ["GITHUB_ACTIONS"] = "true"
+    with open(input_file.replace(".log", ".xml"), "rb") as f:
+        expected_xml = f.read()
+    with open(input_file.replace(".log", ".txt"), "rb") as f:
+        expected_txt = f.read()
+    return expected_xml, expected_txt
 
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    script = os.path.join(script_dir, "..", "logToCs.py")
 
-    command = [script, input_file, xml_file]
-    print(" ".join(command))
-    with open(output_file, "wb") as out_file:
-        subprocess.run(command, stdout=out_file, check=True)
+def write_actual(input_file, xml_output, txt_output):
+    """
+    Write the actual outputs to `OUT` to ease comparison on failure
+    """
+    os.makedirs(OUT_DIRECTORY, exist_ok=True)
+    basename = os.path.basename(input_file)
+    for extension, data in ((".xml", xml_output), (".txt", txt_output)):
+        actual_fn = os.path.join(
+            OUT_DIRECTORY, basename.replace(".log", extension)
+        )
+        with open(actual_fn, "wb") as actual_file:
+            actual_file.write(data)
 
 
 # Function to compare the program output with expected output
-def test_program_output():
+@pytest.mark.parametrize("input_file", get_test_files(), ids=os.path.basename)
+def test_program_output(input_file):
     """
     Test our program using the files in directory `IN`
     """
-    # pylint: disable=too-many-locals
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    in_directory = os.path.join(script_dir, "IN")
-    out_directory = os.path.join(script_dir, "OUT")
-    os.makedirs(out_directory, exist_ok=True)
-
-    for input_file in get_test_files(in_directory):
-        log_file = input_file
-        expected_xml_file = input_file.replace(".log", ".xml")
-        expected_txt_file = input_file.replace(".log", ".txt")
-
-        xml_file = os.path.join(
-            out_directory, os.path.basename(expected_xml_file)
-        )
-        txt_file = os.path.join(
-            out_directory, os.path.basename(expected_txt_file)
-        )
-
-        file_paths = [
-            [expected_xml_file, xml_file],
-            [expected_txt_file, txt_file],
-        ]
-
-        # Run the program and capture stdout to a file
-        run_program(log_file, xml_file, txt_file)
-
-        for expected_fn, actual_fn in file_paths:
-            # Read the actual and expected outputs
-            with open(actual_fn, "rb") as actual_file:
-                actual_output = actual_file.read()
-
-            with open(expected_fn, "rb") as expected_file:
-                expected_output = expected_file.read()
-
-            # Compare the actual and expected outputs
-            assert (
-                actual_output == expected_output
-            ), f"Contents for {actual_fn} does not match {expected_fn}"
-            print(
-                "Comparison successful for files: "
-                f"{actual_fn} and {expected_fn}"
-            )
-            # captured = capsys.readouterr()
-            # print(captured.out)
-
-
-# pylint: disable=unused-argument
-def pytest_sessionfinish(session, exitstatus):
+    output = io.StringIO()
+    stdout = io.StringIO()
+    logToCs.run(
+        [input_file],
+        environ=get_environment(),
+        stdout=stdout,
+        output=output,
+    )
+    xml_output = output.getvalue().encode("utf_8")
+    txt_output = stdout.getvalue().encode("utf_8")
+    write_actual(input_file, xml_output, txt_output)
+
+    expected_xml, expected_txt = read_expected(input_file)
+    assert xml_output == expected_xml, f"Report for {input_file} differs"
+    assert txt_output == expected_txt, f"Stdout for {input_file} differs"
+
+
+def test_script():
     """
-    Cleanup after tests
+    Run the script itself on one of the files in directory `IN`
     """
-    # os.remove('temp_output.txt')
+    input_file = os.path.join(IN_DIRECTORY, "phpunit.log")
+    script = os.path.join(SCRIPT_DIR, "..", "logToCs.py")
+    os.makedirs(OUT_DIRECTORY, exist_ok=True)
+    xml_file = os.path.join(OUT_DIRECTORY, "script_phpunit.xml")
+
+    result = subprocess.run(
+        [sys.executable, script, input_file, xml_file],
+        env=get_environment(),
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    with open(xml_file, "rb") as actual_file:
+        xml_output = actual_file.read()
+
+    expected_xml, expected_txt = read_expected(input_file)
+    assert xml_output == expected_xml
+    assert result.stdout == expected_txt
 
 
 if __name__ == "__main__":
     # Run the tests using pytest
-    # test_program_output()
     exit_code = pytest.main([__file__])
     sys.exit(exit_code)
@@ -0,0 +1,152 @@
+"""
+Test merging CheckStyle and GitLab reports.
+"""
+
+import io
+import json
+import os
+
+import pytest
+
+import logToCs
+
+IN_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "IN")
+NOTICE = {
+    "file_name": "a.py",
+    "line": "1",
+    "severity": "error",
+    "message": "m",
+}
+
+
+def merge_checkstyle(*names, **options):
+    """
+    Merge reports from the IN directory, return the resulting xml
+    """
+    stream = io.StringIO()
+    logToCs.merge_checkstyle_reports(
+        [os.path.join(IN_DIRECTORY, name) for name in names],
+        stream,
+        **options,
+    )
+    return stream.getvalue()
+
+
+def test_merge_single_report_is_unchanged():
+    """
+    Merging one report reproduces it
+    """
+    with open(os.path.join(IN_DIRECTORY, "emacs.xml"), encoding="utf_8") as f:
+        expected = f.read()
+    assert merge_checkstyle("emacs.xml") == expected
+
+
+def test_merge_coalesces_and_dedups():
+    """
+    Files are coalesced across reports, identical errors can be dropped
+    """
+    expected = merge_checkstyle("phan.xml")
+    merged = merge_checkstyle("phan.xml", "phan.xml")
+    assert merged.count("<file ") == expected.count("<file ")
+    assert merged.count("<error ") == 2 * expected.count("<error ")
+    assert merge_checkstyle("phan.xml", "phan.xml", dedup=True) == expected
+
+
+@pytest.mark.parametrize("dedup", [False, True])
+def test_merge_spilled(monkeypatch, dedup):
+    """
+    Spilling errors to temporary files gives the same merged report
+    """
+    monkeypatch.setattr(logToCs, "SPILL_MERGE_FAN_IN", 3)
+    names = ("phan.xml", "misc.xml", "pylint.xml", "phan2.xml", "phan.xml")
+    assert merge_checkstyle(
+        *names, dedup=dedup, max_memory=0
+    ) == merge_checkstyle(*names, dedup=dedup)
+
+
+def test_merge_empty_report():
+    """
+    A report without files remains a valid (empty) report
+    """
+    assert merge_checkstyle("misc.xml").endswith(
+        '<checkstyle version="6.5" />'
+    )
+
+
+def test_merge_gitlab(tmp_path):
+    """
+    GitLab reports are concatenated, optionally without duplicates
+    """
+    notices = [
+        NOTICE,
+        {
+            "file_name": "b.py",
+            "line": "2",
+            "severity": "error",
+            "message": "n",
+        },
+    ]
+    report = tmp_path / "report.json"
+    report.write_text(json.dumps(logToCs.gl_notices(notices)))
+
+    stream = io.StringIO()
+    logToCs.merge_gitlab_reports([report, report], stream)
+    assert len(json.loads(stream.getvalue())) == 4
+
+    stream = io.StringIO()
+    logToCs.merge_gitlab_reports([report, report], stream, dedup=True)
+    assert stream.getvalue() == json.dumps(logToCs.gl_notices(notices))
+
+
+def test_iter_json_array(monkeypatch):
+    """
+    JSON arrays are read by chunks, items can span chunks
+    """
+    monkeypatch.setattr(logToCs, "JSON_READ_SIZE", 3)
+    text = ' [1, "a,]", {"b": [2, 3]}, 456789 ]\n'
+    assert list(logToCs.iter_json_array(io.StringIO(text))) == json.loads(text)
+    assert not list(logToCs.iter_json_array(io.StringIO("[]")))
+    for text in ("", "[1,", "[1 2]", "[1]x", "{}"):
+        with pytest.raises(ValueError):
+            list(logToCs.iter_json_array(io.StringIO(text)))
+
+
+def test_merge_format_detection(tmp_path, capsys):
+    """
+    The format of the merged reports comes from their content
+    """
+    report = tmp_path / "report.json"
+    report.write_text(json.dumps(logToCs.gl_notices([NOTICE])))
+    checkstyle = os.path.join(IN_DIRECTORY, "phan.xml")
+
+    # --gitlab defaults to True in GitLab CI, CheckStyle is still merged
+    output = io.StringIO()
+    logToCs.run(
+        ["--merge", checkstyle, checkstyle, "--dedup"],
+        environ={"GITLAB_CI": "true"},
+        output=output,
+        stdout=io.StringIO(),
+    )
+    assert output.getvalue() == merge_checkstyle("phan.xml")
+
+    output = io.StringIO()
+    logToCs.run(
+        ["--merge", str(report)],
+        environ={},
+        output=output,
+        stdout=io.StringIO(),
+    )
+    assert json.loads(output.getvalue()) == logToCs.gl_notices([NOTICE])
+
+    invalid = tmp_path / "invalid.json"
+    invalid.write_text('[{"a": 1}, {"b":')
+    for sources in ([checkstyle, str(report)], [str(invalid)]):
+        with pytest.raises(SystemExit) as excinfo:
+            logToCs.run(
+                ["--merge", *sources],
+                environ={},
+                output=io.StringIO(),
+                stdout=io.StringIO(),
+            )
+        assert excinfo.value.code == 2
+    assert "invalid.json" in capsys.readouterr().err
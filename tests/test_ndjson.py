@@ -0,0 +1,101 @@
+"""
+Test the NDJSON notice stream (output and input).
+"""
+
+import io
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+from glob import glob
+
+import benchmark
+import pytest
+
+import logToCs
+
+IN_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "IN")
+LOGTOCS = os.path.join(IN_DIRECTORY, "..", "..", "logToCs.py")
+
+
+def read_log(log_file):
+    """
+    Read log file like the script does
+    """
+    with open(log_file, encoding="utf_8", errors="surrogateescape") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize(
+    "log_file", sorted(glob(os.path.join(IN_DIRECTORY, "*.log")))
+)
+def test_stream_matches_parse_file(log_file):
+    """
+    Parsing a stream by small blocks gives the same notices as parse_file
+    """
+    text = read_log(log_file)
+    expected = logToCs.parse_file(text)
+    notices = logToCs.iter_parse_stream(
+        io.StringIO(text), block_lines=7, lookahead_lines=5
+    )
+    assert list(notices) == expected
+
+
+@pytest.mark.parametrize(
+    "log_file", sorted(glob(os.path.join(IN_DIRECTORY, "*.log")))
+)
+def test_ndjson_roundtrip(log_file):
+    """
+    NDJSON output read back renders the same CheckStyle report
+    """
+    notices = logToCs.parse_file(read_log(log_file))
+    stream = io.StringIO()
+    count = logToCs.write_ndjson_notices(notices, stream, batch_size=3)
+    assert count == len(notices)
+
+    lines = stream.getvalue().splitlines(keepends=True)
+    assert len(lines) == len(notices)
+    read_back = list(logToCs.read_ndjson_notices(lines))
+    assert logToCs.convert_notices_to_checkstyle(
+        read_back
+    ) == logToCs.convert_notices_to_checkstyle(notices)
+    assert logToCs.gl_notices(read_back) == logToCs.gl_notices(notices)
+
+
+def test_ndjson_compact():
+    """
+    Fields that are not set are not written
+    """
+    line = logToCs.notice_to_ndjson(
+        {"file_name": "a.py", "line": "3", "column": None, "message": "m"}
+    )
+    assert line == '{"file_name":"a.py","line":"3","message":"m"}\n'
+
+
+@pytest.mark.skipif(os.name == "nt", reason="Pipes are not polled on Windows")
+def test_ndjson_from_pipe():
+    """
+    Notices read from a pipe are written while the producer still runs
+    """
+    with subprocess.Popen(
+        [sys.executable, LOGTOCS, "--ndjson", "--no-github-annotate"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        env=benchmark.get_script_environment(),
+    ) as process:
+        assert process.stdin is not None and process.stdout is not None
+        process.stdin.write(b"src/file.py:10:2: Some linting issue\n")
+        process.stdin.flush()
+        lines: queue.Queue = queue.Queue()
+        stdout = process.stdout
+        threading.Thread(
+            target=lambda: lines.put(stdout.readline()), daemon=True
+        ).start()
+        try:
+            line = lines.get(timeout=10)
+        finally:
+            process.stdin.close()
+    notice = json.loads(line)
+    assert (notice["file_name"], notice["line"]) == ("src/file.py", "10")
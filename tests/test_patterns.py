@@ -0,0 +1,206 @@
+"""
+Test pattern packs and the pattern bundle.
+"""
+
+import copy
+import io
+import json
+import os
+import re
+from glob import glob
+
+import pytest
+
+import logToCs
+
+IN_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "IN")
+
+PACK: dict = {
+    "families": [
+        {
+            "name": "mytool",
+            "patterns": [
+                "^MYTOOL {SEVERITY} {FILE}@{LINE}: {MSG}$",
+                ["^MYTOOL-GROUP {FILEGROUP}", "$"],
+                "^  ~{LINE}~ {MSG}$",
+            ],
+        },
+        {"name": "late", "order": 1, "patterns": ["^LATE {FILE}: {MSG}$"]},
+    ]
+}
+
+LOG = """MYTOOL warning src/a.c@12: Unused variable
+MYTOOL-GROUP src/b.c
+  ~7~ Line too long
+LATE src/c.c: Late message
+"""
+
+
+def write_pack(tmp_path, pack, name="pack.json"):
+    """
+    Write a pattern pack, return its path
+    """
+    path = tmp_path / name
+    path.write_text(json.dumps(pack), encoding="utf_8")
+    return str(path)
+
+
+def test_pack_order_and_families(tmp_path):
+    """
+    Families are placed according to their order around PATTERNS
+    """
+    bundle = logToCs.load_pattern_packs([write_pack(tmp_path, PACK)])
+    builtin_count = len(logToCs.PATTERNS)
+    assert bundle["families"] == [
+        ["mytool", 0, 3],
+        ["builtin", 3, builtin_count],
+        ["late", 3 + builtin_count, 1],
+    ]
+    assert bundle["sources"][3] == logToCs.get_pattern_source(
+        logToCs.PATTERNS[0]
+    )
+    # Builtin patterns are labelled by name, others by position
+    assert bundle["labels"][2:5] == ["mytool:3", "sqlfluff-group", "sqlfluff"]
+    assert bundle["labels"][-1] == "late:1"
+
+
+def test_pack_patterns_are_used(tmp_path):
+    """
+    Patterns from packs are used, also with group state
+    """
+    stdout = io.StringIO()
+    logToCs.run(
+        [
+            "--patterns",
+            write_pack(tmp_path, PACK),
+            "--pattern-cache",
+            "",
+            "--ndjson",
+            "--no-github-annotate",
+        ],
+        environ={},
+        stdin=io.StringIO(LOG),
+        stdout=stdout,
+    )
+    notices = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert [
+        (n["file_name"], n.get("line"), n["severity"]) for n in notices
+    ] == [
+        ("src/a.c", "12", "warning"),
+        ("src/b.c", "7", "error"),
+        ("src/c.c", None, "error"),
+    ]
+    # PATTERNS are restored
+    assert "MYTOOL" not in "".join(
+        map(logToCs.get_pattern_source, logToCs.PATTERNS)
+    )
+    assert logToCs.get_pattern_bundle()["labels"][0] == "sqlfluff-group"
+
+
+@pytest.mark.parametrize(
+    "pattern, error",
+    [
+        ("^{FILE}:{UNKNOWN}$", "unknown placeholder"),
+        ("^{FILE}:(?P<lines>\\d+)$", "unknown group"),
+        ("^{FILE}:(\\d+$", "invalid regular expression"),
+        ("^\\d+$", "no named group"),
+        ("^{FILE}$", "matches an empty string"),
+    ],
+)
+def test_pack_validation(tmp_path, pattern, error):
+    """
+    Invalid patterns are reported with their family and index
+    """
+    pack = {"families": [{"name": "bad", "patterns": ["^X{MSG}$", pattern]}]}
+    with pytest.raises(ValueError, match=f"family 'bad': pattern 1: {error}"):
+        logToCs.load_pattern_packs([write_pack(tmp_path, pack)])
+
+
+def test_pack_cache(tmp_path):
+    """
+    The bundle is cached by content and reused
+    """
+    cache_dir = tmp_path / "cache"
+    pack_file = write_pack(tmp_path, PACK)
+    bundle = logToCs.load_pattern_packs([pack_file], str(cache_dir))
+    (cache_file,) = cache_dir.iterdir()
+
+    # Show that the cached version is used
+    cached = json.loads(cache_file.read_text(encoding="utf_8"))
+    cached["families"][0][0] = "from-cache"
+    cache_file.write_text(json.dumps(cached), encoding="utf_8")
+    bundle = logToCs.load_pattern_packs([pack_file], str(cache_dir))
+    assert bundle["families"][0][0] == "from-cache"
+
+    # A change in the pack gives a new entry
+    pack = copy.deepcopy(PACK)
+    pack["families"][1]["order"] = 2
+    write_pack(tmp_path, pack)
+    bundle = logToCs.load_pattern_packs([pack_file], str(cache_dir))
+    assert bundle["families"][0][0] == "mytool"
+    assert len(list(cache_dir.iterdir())) == 2
+
+
+def test_dispatch_index():
+    """
+    The dispatch index gives the same result as trying all patterns
+    """
+    compiled_patterns = logToCs.get_compiled_patterns()
+    labels = logToCs.get_pattern_bundle()["labels"]
+    for log_file in glob(os.path.join(IN_DIRECTORY, "*.log")):
+        with open(log_file, encoding="utf_8", errors="surrogateescape") as f:
+            lines = re.split(r"[\r\n]+", f.read())
+        state: dict = {}
+        expected_state: dict = {}
+        for line in lines:
+            expected = None
+            for pattern, label in zip(compiled_patterns, labels):
+                fields = pattern.match(line)
+                if fields:
+                    expected = logToCs.groups_to_notice(
+                        fields.groupdict().items(), expected_state
+                    )
+                    if expected is not None:
+                        expected["pattern"] = label
+                    break
+            assert logToCs.parse_message(line, state) == expected, line
+
+
+@pytest.mark.parametrize(
+    "line, severity",
+    [
+        ("src/A.java:12: warn: Some message", "warning"),
+        ("src/A.java:12: Warning: Some message", "warning"),
+        ("src/A.java:12: fail: Some message", "error"),
+        ("src/A.java:12: style: Some message", "notice"),
+        ("src/a.c:12:3: Some message", "error"),
+    ],
+)
+def test_severity_normalization(line, severity):
+    """
+    Both parsers normalize the severity the same way
+    """
+    (notice,) = logToCs.parse_file(line + "\n")
+    assert notice["severity"] == severity
+    assert logToCs.parse_message(line) == notice
+
+
+@pytest.mark.parametrize(
+    "log_name",
+    ["codespell_ansi", "emacs", "phan", "phan2", "pylint", "sqlfluff"],
+)
+def test_parsers_consistent(log_name):
+    """
+    Parsing by line gives the same notices for logs without multiline
+    messages
+    """
+    with open(
+        os.path.join(IN_DIRECTORY, f"{log_name}.log"),
+        encoding="utf_8",
+        errors="surrogateescape",
+    ) as f:
+        text = logToCs.strip_ansi(f.read())
+    expected = logToCs.parse_file(text)
+    assert expected
+    lines = re.split(r"[\r\n]+", text)
+    assert logToCs.convert_lines_to_notices(lines) == expected
@@ -0,0 +1,48 @@
+"""
+Test the startup time of the script (`python -X importtime`).
+"""
+
+import os
+
+import benchmark
+import pytest
+
+# Budget for the time spent importing modules when starting the script
+STARTUP_BUDGET_MS = float(os.environ.get("LOGTOCS_STARTUP_BUDGET_MS", 100))
+
+LOG = b"src/file.py:10:2: Some linting issue\n"
+
+
+@pytest.mark.parametrize(
+    "args, unused_modules",
+    [
+        (["--name-only"], ["json", "xml.etree.ElementTree", "datetime"]),
+        (["--gitlab"], ["xml.etree.ElementTree", "datetime"]),
+        (["--ndjson"], ["xml.etree.ElementTree", "datetime"]),
+        ([], ["json", "datetime"]),
+    ],
+)
+def test_output_imports(args, unused_modules):
+    """
+    Each output only imports the modules it needs
+    """
+    import_times = benchmark.measure_import_time(
+        ["--no-github-annotate", *args], LOG
+    )
+    for module in unused_modules:
+        assert module not in import_times
+
+
+@pytest.mark.skipif(
+    "PYTEST_XDIST_WORKER" in os.environ,
+    reason="Timings are not reliable while tests run in parallel",
+)
+def test_startup_budget():
+    """
+    The time to import the modules stays within budget
+    """
+    import_times = benchmark.measure_import_time(["--no-github-annotate"], LOG)
+    total_ms = sum(import_times.values()) / 1000
+    assert (
+        total_ms < STARTUP_BUDGET_MS
+    ), f"Imports take {total_ms:.1f} ms: {import_times}"